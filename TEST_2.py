@@ -1,13 +1,12 @@
 import streamlit as st
-import requests
-import json
-import base64
 import pandas as pd
-import io
-import re
-from datetime import datetime, date, timedelta, time
-from supabase import create_client, Client
 import os
+import re
+import threading
+from datetime import datetime, date, timedelta
+from time import monotonic
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from dxc_core import closeout, connectwise, dispatch, export, flatten, instrumentation, jobs, live_dispatches, notes, reports, rules, runtime, snapshots, store, supabase_client, technicians
 
 # ------------------------------------------------- CONFIGURATION FOR STREAMLIT LAYOUT -------------------------------------------------
 
@@ -15,423 +14,60 @@ st.set_page_config(
     page_title="DXC Runbook",
     layout="wide")
 
-# ------------------------------------------------- CONNECTWISE API CONFIG -------------------------------------------------
+# ------------------------------------------------- CORE SETUP -------------------------------------------------
 
-def create_supabase_client():
+def load_secrets():
     try:
-        url = st.secrets.supabase.SUPABASE_URL
-        key = st.secrets.supabase.SUPABASE_KEY
-        return create_client(url, key)
-    except KeyError as e:
-        st.error(f"Missing Supabase credential in `secrets.toml`: {e}")
-        return None
+        return st.secrets.to_dict()
+    except FileNotFoundError:
+        return {}
+def script_run_ctx_initializer():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    def attach_script_run_ctx():
+        if ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+    return attach_script_run_ctx
+def report_errors(result):
+    for error in result.errors:
+        st.error(error)
+    return result.value
 def get_connectwise_auth_headers():
-    try:
-        connectwise_secrets = st.secrets["connectwise"]
-        companyId = connectwise_secrets["connectwise_company_id"]
-        publicKey = connectwise_secrets["connectwise_public_key"]
-        privateKey = connectwise_secrets["connectwise_private_key"]
-        clientId = connectwise_secrets["connectwise_client_id"]
-        base_url = connectwise_secrets.get("connectwise_url_base", "https://api-na.myconnectwise.net/v4_6_release/apis/3.0")
-    except KeyError as e:
-        st.error(f"Missing ConnectWise credential in `secrets.toml`: {e}")
-        return None, None
-    auth_string = f"{companyId}+{publicKey}:{privateKey}"
-    encoded_auth_string = base64.b64encode(auth_string.encode("ascii")).decode("ascii")
-    headers = {
-        "Authorization": f"Basic {encoded_auth_string}",
-        "clientId": clientId,
-        "Accept": "application/vnd.connectwise.com+json",
-        "Content-Type": "application/json"}
-    return headers, base_url
-def get_connectwise_boards(headers, base_url):
-    if not headers or not base_url:
-        return None
-    url = f"{base_url}/service/boards"
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status() 
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error fetching boards: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching ConnectWise boards: {e}")
-        return None
-def get_connectwise_tickets(headers, base_url, board_id=None, status_id=None, start_date=None, end_date=None):
-    if not headers or not base_url:
-        return None
-    all_tickets = []
-    page = 1
-    page_size = 1000
-    while True:
-        url = f"{base_url}/service/tickets"
-        conditions = []
-        if board_id:
-            conditions.append(f'board/id = {board_id}')
-        if start_date and end_date:
-            start_date_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
-            end_date_str = end_date.strftime("%Y-%m-%dT23:59:59Z")
-            conditions.append(f'dateEntered >= "{start_date_str}" and dateEntered <= "{end_date_str}"')
-        elif start_date:
-            start_date_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
-            conditions.append(f'dateEntered >= "{start_date_str}"')
-        elif end_date:
-            end_date_str = end_date.strftime("%Y-%m-%dT23:59:59Z")
-            conditions.append(f'dateEntered <= "{end_date_str}"')
-        params = {
-            "pageSize": page_size,
-            "page": page}
-        if conditions:
-            params["conditions"] = " and ".join(conditions)
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status() 
-            tickets = response.json()
-            if not tickets:
-                break
-            all_tickets.extend(tickets)
-            if len(tickets) < page_size:
-                break
-            page += 1
-        except requests.exceptions.HTTPError as e:
-            st.error(f"HTTP Error: {e}")
-            st.error(f"Response content: {e.response.text}")
-            return None
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error fetching ConnectWise tickets: {e}")
-            return None
-    return all_tickets
-def get_connectwise_single_ticket(headers, base_url, ticket_id):
-    if not headers or not base_url or not ticket_id:
-        return None
-    url = f"{base_url}/service/tickets/{ticket_id}"
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status() 
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error fetching ticket {ticket_id}: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching ConnectWise ticket {ticket_id}: {e}")
-        return None
-def get_connectwise_ticket_notes(headers, base_url, ticket_id):
-    if not headers or not base_url or not ticket_id:
-        return None
-    url = f"{base_url}/service/tickets/{ticket_id}/notes"
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error fetching notes for ticket {ticket_id}: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching ConnectWise ticket notes: {e}")
-        return None
-def add_connectwise_ticket_note(headers, base_url, ticket_id, note_text):
-    if not headers or not base_url or not ticket_id or not note_text:
-        st.error("Missing parameters for adding a ticket note.")
-        return None
-    url = f"{base_url}/service/tickets/{ticket_id}/notes"
-    note_payload = {
-        "text": note_text,
-        "detailDescriptionFlag": True,
-        "internalAnalysisFlag": False,
-        "resolutionFlag": False}
-    try:
-        response = requests.post(url, headers=headers, json=note_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error adding note to ticket {ticket_id}: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error adding ConnectWise ticket note: {e}")
-        return None
-def add_connectwise_resolution_note(headers, base_url, ticket_id, note_text):
-    if not headers or not base_url or not ticket_id or not note_text:
-        st.error("Missing parameters for adding a resolution note.")
-        return None
-    url = f"{base_url}/service/tickets/{ticket_id}/notes"
-    note_payload = {
-        "text": note_text,
-        "detailDescriptionFlag": False,
-        "internalAnalysisFlag": False,
-        "resolutionFlag": True}
-    try:
-        response = requests.post(url, headers=headers, json=note_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error adding resolution note to ticket {ticket_id}: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error adding ConnectWise resolution note: {e}")
-        return None
-def flatten_ticket_data(tickets, headers, base_url):
-    flattened_tickets = []
-    hp_now_pattern = re.compile(r"HP Now Ticket #\s*([^\s\n]+)", re.IGNORECASE)
-    custom_field_mapping = {
-        'check-in': 'CW-Check-In (Custom Field)',
-        'check-out': 'CW-Check-Out (Custom Field)',
-        'total hours': 'CW-Total Hours (Custom Field)',
-        'technician name': 'CW-Technician Name (Custom Field)',
-        'description': 'CW-Description (Custom Field)'}
-    two_hour_sites = ["AQN", "BOI", "COR", "PAL", "SDG"]
-    for ticket in tickets:
-        flattened_ticket = {}
-        full_description = ''
-        ticket_notes = get_connectwise_ticket_notes(headers, base_url, ticket['id'])
-        if ticket_notes and len(ticket_notes) > 0 and 'text' in ticket_notes[0]:
-            full_description = ticket_notes[0]['text']
-        flattened_ticket['Full Description'] = full_description
-        hp_now_ticket_value = None
-        if full_description:
-            match = hp_now_pattern.search(full_description)
-            if match:
-                hp_now_ticket_value = match.group(1).strip()
-        flattened_ticket['HP Now Ticket #'] = hp_now_ticket_value
-        flattened_ticket['Type'] = ticket.get('type', {}).get('name', 'N/A')
-        flattened_ticket['Subtype'] = ticket.get('subType', {}).get('name', 'N/A')
-        flattened_ticket['Item'] = ticket.get('item', {}).get('name', 'N/A')
-        for key, value in ticket.items():
-            if isinstance(value, dict) and 'name' in value:
-                flattened_ticket[key] = value['name']
-            elif key == 'customFields' and isinstance(value, list):
-                for custom_field in value:
-                    if 'caption' in custom_field:
-                        caption_lower = custom_field['caption'].lower()
-                        found_match = False
-                        for match_key, new_key in custom_field_mapping.items():
-                            if match_key in caption_lower:
-                                flattened_ticket[new_key] = custom_field.get('value', None)
-                                found_match = True
-                                break
-                        if not found_match:
-                            flattened_ticket[f"CW-{custom_field['caption']} (Custom Field)"] = custom_field.get('value', None)
-            else:
-                flattened_ticket[key] = value
-        sla = "N/A"
-        priority_name = flattened_ticket.get('priority')
-        site_name_with_code = flattened_ticket.get('site')
-        site_code = None
-        if site_name_with_code and ' - ' in site_name_with_code:
-            site_code = site_name_with_code.split(' - ')[-1].strip()
-        two_hour_sites = ["AQN", "BOI", "COR", "PAL", "SDG"]
-        if priority_name == "Priority 3 - Medium":
-            sla = "2 Day"
-        elif priority_name == "Priority 4 - Low":
-            sla = "4 Day"
-        elif priority_name in ["Priority 1 - Critical", "Priority 2 - High"]:
-            if site_code and site_code in two_hour_sites:
-                sla = "2 Hour"
-            else:
-                sla = "4 Hour"
-        flattened_ticket['SLA'] = sla
-        flattened_tickets.append(flattened_ticket)
-    return flattened_tickets
-def parse_cw_timestamp(timestamp_str):
-    if not timestamp_str or not isinstance(timestamp_str, str):
-        return None, None
-    try:
-        dt_obj = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-        return dt_obj.date(), dt_obj.strftime("%I:%M %p")
-    except ValueError:
-        return None, None
-def get_company_by_name(headers, base_url, company_name):
-    if not headers or not base_url or not company_name:
-        return None
-    url = f"{base_url}/company/companies"
-    params = {
-        "conditions": f'name = "{company_name}"'}
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        companies = response.json()
-        if companies:
-            return companies[0]
-        return None
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error fetching company '{company_name}': {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching ConnectWise company details: {e}")
-        return None
-def get_site_by_name(headers, base_url, company_id, site_name):
-    if not headers or not base_url or not site_name or not company_id:
-        return None
-    url = f"{base_url}/company/companies/{company_id}/sites"
-    params = {
-        "conditions": f'name like "{site_name}"'}
-    try:
-        st.info(f"Searching for site name matching '{site_name}' within company ID {company_id}...")
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        sites = response.json()
-        for site in sites:
-            if site.get('name', '').lower().find(site_name.lower()) != -1:
-                return site
-        return None
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error fetching site '{site_name}': {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching ConnectWise site details: {e}")
-        return None
-def update_connectwise_ticket(headers, base_url, ticket_id, update_payload):
-    if not headers or not base_url or not ticket_id or not update_payload:
-        st.error("Missing parameters for ticket update.")
-        return None
-    url = f"{base_url}/service/tickets/{ticket_id}"
-    try:
-        response = requests.patch(url, headers=headers, json=update_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error updating ticket {ticket_id}: {e}")
-        st.error(f"Response content: {e.response.text}")
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error updating ConnectWise ticket {ticket_id}: {e}")
-        return None
-def get_technicians_by_site(site_code):
-    supabase: Client = create_supabase_client()
-    if not supabase:
-        return None
-    try:
-        response_names_and_sites = supabase.table('names_and_sites').select('Name').eq('Site', site_code).eq('Badge', 'YES').execute()
-        if not response_names_and_sites.data:
-            return pd.DataFrame()
-        badged_tech_names = [item['Name'] for item in response_names_and_sites.data]
-        if not badged_tech_names:
-            return pd.DataFrame()
-        tech_data = []
-        for full_name in badged_tech_names:
-            parts = full_name.split()
-            first_name = parts[0]
-            last_name = parts[-1]
-            response_tech_info = supabase.table('TECH INFORMATION').select('FIRST_NAME, LAST_NAME, PHONE_NUMBER, FIELD_NATION_ID, SURYL_EMAIL').eq('FIRST_NAME', first_name).eq('LAST_NAME', last_name).eq('SITE', site_code).execute()
-            if response_tech_info.data:
-                tech_data.append(response_tech_info.data[0])
-        if tech_data:
-            df = pd.DataFrame(tech_data)
-            display_df = df[['FIRST_NAME', 'LAST_NAME', 'PHONE_NUMBER', 'FIELD_NATION_ID', 'SURYL_EMAIL']]
-            return display_df
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error querying Supabase: {e}")
-        return None
-def get_all_technicians():
-    approved_technicians = [
-        {'first_name': 'Mike', 'last_name': 'Sears'},
-        {'first_name': 'Chaz', 'last_name': 'Crommartie'}]
-    return approved_technicians
-def calculate_multiplier(check_in_date: date, check_in_time: time) -> float:
-    check_in_datetime = datetime.combine(check_in_date, check_in_time)
-    day_of_week = check_in_datetime.weekday()
-    hour = check_in_datetime.hour
-    if day_of_week == 6:
-        return 2.0
-    elif day_of_week == 5:
-        if 8 <= hour < 18:
-            return 1.5
-        else:
-            return 2.0
-    elif 0 <= day_of_week <= 4:
-        if 8 <= hour < 18:
-            return 1.0
-        elif 18 <= hour:
-            return 1.5
-        else:
-            return 2.0  
-    return 1.0
-def find_field_nation_internal_note(ticket_notes: list) -> str:
-    if not ticket_notes:
-        return "No Field Nation internal note found."
-    for note in ticket_notes:
-        if note.get('createdBy') == 'FieldNationAPI' and note.get('internalAnalysisFlag') is True:
-            return note.get('text', "No text found in Field Nation internal note.")
-    return "No Field Nation internal note found."
-def extract_actions_taken(full_description: str) -> str:
-    if not full_description:
-        return "No provider notes found in the ticket's internal notes."
-    pattern = re.compile(r".*Provider(?:'s|&#039;s|&#39;s)?\s+closing\s+notes:?\s*(.*)", re.IGNORECASE | re.DOTALL)
-    match = pattern.search(full_description)
-    if match:
-        return match.group(1).strip()
-    return "No provider notes found in the ticket's internal notes."
-def update_ticket_dates(eta_string, ticket_id):
-    try:
-        parsed_datetime = datetime.strptime(eta_string.strip(), "%m/%d, %I:%M%p")
-    except ValueError:
-        try:
-            parsed_datetime = datetime.strptime(eta_string.strip(), "%m/%d, %I%p")
-        except ValueError:
-            st.error("Invalid ETA format. Please use 'MM/DD, HPM' (e.g., '9/13, 1PM') or 'MM/DD, H:MM PM' (e.g., '8/12, 12:30PM').")
-            return
-    current_year = datetime.now().year
-    start_datetime = parsed_datetime.replace(year=current_year)
-    end_datetime = start_datetime + timedelta(hours=2)
-    start_date_str = start_datetime.strftime("%Y-%m-%dT00:00:00Z")
-    end_date_str = end_datetime.strftime("%Y-%m-%dT00:00:00Z")
-    if start_datetime.minute == 0:
-        start_time_str = start_datetime.strftime("%I%p").lstrip('0').lower()
-    else:
-        start_time_str = start_datetime.strftime("%I:%M%p").lstrip('0').lower()
-    if end_datetime.minute == 0:
-        end_time_str = end_datetime.strftime("%I%p").lstrip('0').lower()
-    else:
-        end_time_str = end_datetime.strftime("%I:%M%p").lstrip('0').lower()
-    payload = [
-            {"op": "replace", "path": "customFields", "value": [
-            {"id": 9, "caption": "Start Date of Request", "value": start_date_str},
-            {"id": 10, "caption": "Start Time of Request", "value": start_time_str},
-            {"id": 11, "caption": "End Date of Request", "value": end_date_str},
-            {"id": 12, "caption": "End Time of Request", "value": end_time_str}]}]
-    auth_headers, base_url = get_connectwise_auth_headers()
-    ticket_id = str(ticket_id)
-    if auth_headers and base_url:
-        try:
-            response = requests.patch(f"{base_url}/service/tickets/{ticket_id}", json=payload, headers=auth_headers)
-            response.raise_for_status()
-            st.success(f"Ticket {ticket_id} scheduling details updated successfully!")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to update ticket {ticket_id} scheduling details: {e}")
+    return report_errors(connectwise.get_connectwise_auth_headers())
+runtime.configure(load_secrets())
+runtime.set_thread_initializer_factory(script_run_ctx_initializer)
+
+# ------------------------------------------------- INSTRUMENTATION -------------------------------------------------
+
+def start_render_metrics(page):
+    st.session_state.render_metrics = instrumentation.RenderMetrics(page)
+    return st.session_state.render_metrics
+def current_render_metrics():
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.get('render_metrics')
+instrumentation.set_metrics_provider(current_render_metrics)
+
+# ------------------------------------------------- BACKGROUND JOBS -------------------------------------------------
+
+JOB_POLL_SECONDS = 1.0
+
+def get_session_job(key):
+    job_id = st.session_state.get(key)
+    return jobs.get_job_runner().get(job_id) if job_id else None
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id):
+    job = jobs.get_job_runner().get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    job_stats = job.stats()
+    if job.fraction is None:
+        st.info(f"{job_stats['Progress']} ({job_stats['Seconds']}s)")
     else:
-        st.error("Failed to get ConnectWise authentication headers.")
-def get_status_by_name(auth_headers, base_url, board_id, status_name):
-    try:
-        url = f"{base_url}/service/boards/{board_id}/statuses"
-        response = requests.get(url, headers=auth_headers)
-        response.raise_for_status()
-        statuses = response.json()
-        for status in statuses:
-            if status.get('name', '').lower() == status_name.lower():
-                return status
-        return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to fetch statuses for board {board_id}: {e}")
-        return None
-def update_connectwise_ticket_status(auth_headers, base_url, ticket_id, status_object):
-    try:
-        url = f"{base_url}/service/tickets/{ticket_id}"
-        payload = [
-            {"op": "replace", "path": "status", "value": status_object}]
-        response = requests.patch(url, json=payload, headers=auth_headers)
-        response.raise_for_status()
-        return True
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to update ticket status for ticket {ticket_id}: {e}")
-        return False
+        st.progress(job.fraction, text=job_stats['Progress'])
+    if job_stats['Sessions'] > 1:
+        st.caption(f"Shared with {job_stats['Sessions'] - 1} other identical request(s).")
+    if job.preview:
+        st.dataframe(pd.concat(job.preview, ignore_index=True))
 
 # ------------------------------------------------- PAGE FUNCTIONS -------------------------------------------------
 
@@ -443,18 +79,49 @@ def landing_page():
 
 # ------------------------------------------------- CW TICKET REPORT -------------------------------------------------
 
+def show_board_report(report_job):
+    report = report_errors(report_job.result)
+    if report is None:
+        return
+    st.info(f"Synced {report['synced']} new or updated tickets into the local store.")
+    for warning in report['warnings']:
+        st.warning(warning)
+    if not report['report'].empty:
+        st.success(f"Tickets fetched successfully for 'DXCSupport Board'!")
+        st.write(f"Found {len(report['report'])} tickets.")
+        df_selected = report['report'].copy()
+        if 'Check in Time' in df_selected.columns:
+            df_selected['Check in Time'] = df_selected['Check in Time'].apply(lambda x: x.strftime('%I:%M %p') if pd.notna(x) else None)
+        if 'Check Out Time' in df_selected.columns:
+            df_selected['Check Out Time'] = df_selected['Check Out Time'].apply(lambda x: x.strftime('%I:%M %p') if pd.notna(x) else None)
+        st.dataframe(df_selected)
+        st.markdown("---")
+        st.header("Export Tickets")
+        for export_format, export_path in report['export_paths'].items():
+            try:
+                with open(export_path, "rb") as export_file:
+                    st.download_button(
+                        label=f"Download {export_format} File",
+                        data=export_file,
+                        file_name=os.path.basename(export_path),
+                        mime=export.REPORT_EXPORT_FORMATS[export_format][1])
+            except FileNotFoundError:
+                st.warning(f"The {export_format} export has expired. Fetch the tickets again to download it.")
+    else:
+        st.warning("No tickets found for the selected date range or an error occurred.")
+    if report['snapshot_rows'] is not None:
+        st.success(f"Saved {report['snapshot_rows']} tickets to monthly Parquet snapshots in `{snapshots.get_ticket_snapshot_dir()}`.")
 def connectwise_page():
     st.title("ConnectWise API Integration")
     st.markdown("This page connects to the ConnectWise API to fetch and display ticket information.")
     auth_headers, base_url = get_connectwise_auth_headers()
     if auth_headers and base_url:
-        if "boards" not in st.session_state:
-            with st.spinner("Fetching service boards..."):
-                boards_data = get_connectwise_boards(auth_headers, base_url)
-                if boards_data:
-                    st.session_state["boards"] = {board["name"]: board["id"] for board in boards_data}
-                else:
-                    st.session_state["boards"] = {}
+        with st.spinner("Fetching service boards..."):
+            boards_data = report_errors(connectwise.get_connectwise_boards(auth_headers, base_url))
+            if boards_data:
+                st.session_state["boards"] = {board["name"]: board["id"] for board in boards_data}
+            else:
+                st.session_state["boards"] = {}
         dxc_board_id = None
         if st.session_state["boards"]:
             dxc_board_name = "DXCSupport"
@@ -470,10 +137,10 @@ def connectwise_page():
             submit_single = st.form_submit_button("Fetch Single Ticket")
         if submit_single and ticket_id_input:
             with st.spinner(f"Fetching single ticket {ticket_id_input}..."):
-                ticket_data = get_connectwise_single_ticket(auth_headers, base_url, ticket_id_input)
+                ticket_data = report_errors(connectwise.get_connectwise_single_ticket(auth_headers, base_url, ticket_id_input))
                 if ticket_data:
                     st.session_state["tickets"] = [ticket_data]
-                    st.session_state["flattened_tickets"] = flatten_ticket_data([ticket_data], auth_headers, base_url)
+                    st.session_state["flattened_tickets"] = report_errors(flatten.flatten_ticket_data([ticket_data], auth_headers, base_url))
                     st.success(f"Ticket {ticket_id_input} fetched successfully!")
                     st.subheader(f"Raw JSON for Ticket {ticket_id_input}")
                     st.json(ticket_data)
@@ -503,78 +170,86 @@ def connectwise_page():
                 start_date = st.date_input("Start Date", value=last_week)
             with col2:
                 end_date = st.date_input("End Date", value=today)
+            full_resync = st.checkbox("Rebuild local ticket store for this board", value=False)
+            export_formats = st.multiselect("Export formats", list(export.REPORT_EXPORT_FORMATS), default=["Excel"])
+            save_snapshot = st.checkbox("Save Parquet snapshots for these months", value=False)
+            synced_ranges = [] if full_resync else store.get_ticket_store().get_sync_state(dxc_board_id)[0]
+            missing_ranges = store.uncovered_date_ranges(synced_ranges, start_date, end_date)
+            if missing_ranges:
+                st.caption(
+                    f"Not in the local ticket store yet: {', '.join(f'{range_start} to {range_end}' for range_start, range_end in missing_ranges)}. "
+                    f"Every ticket entered on these dates is fetched from ConnectWise with its notes, about "
+                    f"{runtime.get_setting('requests_per_second', connectwise.CONNECTWISE_REQUESTS_PER_SECOND):g} tickets a second.")
+            else:
+                st.caption("This range is already in the local ticket store. Only tickets updated since the last pull are fetched.")
             if st.button("Fetch DXCSupport Tickets"):
-                with st.spinner(f"Fetching tickets from {start_date} to {end_date} for DXCSupport Board..."):
-                    tickets = get_connectwise_tickets(
-                        auth_headers, 
-                        base_url, 
-                        board_id=dxc_board_id, 
-                        start_date=start_date,
-                        end_date=end_date)
-                if tickets:
-                    st.session_state["tickets"] = tickets
-                    st.session_state["flattened_tickets"] = flatten_ticket_data(tickets, auth_headers, base_url)
-                    st.success(f"Tickets fetched successfully for 'DXCSupport Board'!")
-                    st.write(f"Found {len(st.session_state['flattened_tickets'])} tickets.")
-                    df = pd.DataFrame(st.session_state["flattened_tickets"])
-                    for col in ['CW-Check-In (Custom Field)', 'CW-Check-Out (Custom Field)']:
-                        if col in df.columns:
-                            df[col] = pd.to_datetime(df[col], errors='coerce')
-                    if 'CW-Check-In (Custom Field)' in df.columns:
-                        df['Check in Date'] = df['CW-Check-In (Custom Field)'].dt.date
-                        df['Check in Time'] = df['CW-Check-In (Custom Field)'].dt.time
-                    if 'CW-Check-Out (Custom Field)' in df.columns:
-                        df['Check Out Date'] = df['CW-Check-Out (Custom Field)'].dt.date
-                        df['Check Out Time'] = df['CW-Check-Out (Custom Field)'].dt.time
-                    columns_to_keep = [
-                        ('HP Now Ticket #', 'HP Now Ticket #'),
-                        ('id', 'Suryl Ticket #'),
-                        ('summary', 'Summary'),
-                        ('site', 'Site Name'),
-                        ('siteName', 'Site Name'),
-                        ('status', 'Status'),
-                        ('type', 'Type'),
-                        ('subType', 'SubType'),
-                        ('Item', 'Item'),
-                        ('priority', 'Priority'),
-                        ('CW-Technician Name (Custom Field)', 'Technician Name'),
-                        ('Check in Date', 'Check In Date'),
-                        ('Check in Time', 'Check In Time'),
-                        ('Check Out Date', 'Check Out Date'),
-                        ('Check Out Time', 'Check Out Time'),
-                        ('CW-Total Hours (Custom Field)', 'Total Hours')]
-                    filtered_data = []
-                    for _, row in df.iterrows():
-                        new_row = {}
-                        for old_key, new_key in columns_to_keep:
-                            new_row[new_key] = row.get(old_key)
-                        filtered_data.append(new_row)
-                    df_selected = pd.DataFrame(filtered_data)
-                    df_for_excel = df_selected.copy()
-                    if 'Check in Time' in df_selected.columns:
-                        df_selected['Check in Time'] = df_selected['Check in Time'].apply(lambda x: x.strftime('%I:%M %p') if pd.notna(x) else None)
-                    if 'Check Out Time' in df_selected.columns:
-                        df_selected['Check Out Time'] = df_selected['Check Out Time'].apply(lambda x: x.strftime('%I:%M %p') if pd.notna(x) else None)
-                    st.dataframe(df_selected)
-                    st.markdown("---")
-                    st.header("Export Tickets to Excel")
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                        df_for_excel.to_excel(writer, index=False, sheet_name='Tickets')
-                    output.seek(0)
-                    st.download_button(
-                        label="Download Excel File",
-                        data=output,
-                        file_name="dxc_connectwise_tickets.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                else:
-                    st.session_state["tickets"] = []
-                    st.session_state["flattened_tickets"] = []
-                    st.warning("No tickets found for the selected date range or an error occurred.")
+                report_job = jobs.get_job_runner().submit(
+                    ("board_report", base_url, dxc_board_id, start_date, end_date, tuple(sorted(export_formats)), full_resync, save_snapshot),
+                    f"DXCSupport report {start_date.isoformat()} to {end_date.isoformat()}",
+                    reports.pull_board_report,
+                    auth_headers,
+                    base_url,
+                    dxc_board_id,
+                    start_date,
+                    end_date,
+                    export_formats,
+                    full_resync=full_resync,
+                    save_snapshot=save_snapshot,
+                    cleanup=reports.discard_board_report)
+                previous_report_job_id = st.session_state.get('report_job_id')
+                st.session_state.report_job_id = report_job.id
+                if previous_report_job_id:
+                    jobs.get_job_runner().release(previous_report_job_id)
+            report_job = get_session_job('report_job_id')
+            if report_job and not report_job.done:
+                job_progress(report_job.id)
+            elif report_job:
+                show_board_report(report_job)
+            st.markdown("---")
+            st.subheader("Month-over-Month SLA (Local Snapshots)")
+            col1, col2 = st.columns(2)
+            with col1:
+                history_start = st.date_input("From Month", value=(today.replace(day=1) - timedelta(days=365)).replace(day=1))
+            with col2:
+                history_end = st.date_input("To Month", value=today)
+            if st.button("Load SLA History"):
+                try:
+                    load_started = monotonic()
+                    snapshot_df = snapshots.load_ticket_snapshots(dxc_board_id, history_start.strftime("%Y-%m"), history_end.strftime("%Y-%m"), columns=snapshots.SLA_HISTORY_COLUMNS)
+                    sla_history = snapshots.build_sla_month_over_month(snapshot_df)
+                    load_seconds = monotonic() - load_started
+                except ImportError:
+                    st.warning("SLA history requires `pyarrow`.")
+                    sla_history = None
+                if sla_history is not None and not sla_history.empty:
+                    st.caption(f"Loaded {len(snapshot_df)} tickets from local snapshots in {load_seconds:.2f}s.")
+                    st.dataframe(sla_history, hide_index=True)
+                    st.bar_chart(sla_history.set_index('Month').drop(columns=['Total', 'Total MoM %']))
+                elif sla_history is not None:
+                    st.info("No snapshots found for the selected months. Fetch tickets with 'Save Parquet snapshots' checked first.")
 
 # ------------------------------------------------- RUNBOOK PAGE -------------------------------------------------
 
-# ------------------------------------------------- RUNBOOK PAGE -------------------------------------------------
+TICKET_VIEW_CACHE_SIZE = 20
+
+def get_ticket_view(headers, base_url, ticket_id, ticket_data=None):
+    ticket_views = st.session_state.setdefault('ticket_views', {})
+    view_key = str(ticket_id)
+    if view_key in ticket_views:
+        return ticket_views[view_key]
+    if ticket_data is None:
+        ticket_data = report_errors(connectwise.get_connectwise_single_ticket(headers, base_url, ticket_id, fields=connectwise.RUNBOOK_TICKET_FIELDS))
+    if not ticket_data:
+        return None
+    ticket_notes = report_errors(connectwise.get_connectwise_ticket_notes(headers, base_url, ticket_id))
+    ticket_view = dispatch.build_ticket_view(ticket_data, ticket_notes)
+    if ticket_notes is not None:
+        ticket_views[view_key] = ticket_view
+        while len(ticket_views) > TICKET_VIEW_CACHE_SIZE:
+            ticket_views.pop(next(iter(ticket_views)))
+    return ticket_view
+def invalidate_ticket_view(ticket_id):
+    st.session_state.setdefault('ticket_views', {}).pop(str(ticket_id), None)
 
 def runbook_page():
     st.title("DXC Runbook")
@@ -599,13 +274,15 @@ def runbook_page():
         auth_headers, base_url = get_connectwise_auth_headers()
         if auth_headers and base_url:
             with st.spinner(f"Fetching ticket {st.session_state.current_ticket_id}..."):
-                ticket_data = get_connectwise_single_ticket(auth_headers, base_url, st.session_state.current_ticket_id)
+                ticket_data = report_errors(connectwise.get_connectwise_single_ticket(auth_headers, base_url, st.session_state.current_ticket_id, fields=connectwise.RUNBOOK_TICKET_FIELDS))
             if ticket_data:
                 st.session_state.current_ticket_data = ticket_data
+                invalidate_ticket_view(st.session_state.current_ticket_id)
+                get_ticket_view(auth_headers, base_url, st.session_state.current_ticket_id, ticket_data)
                 company_name = ticket_data.get('company', {}).get('name')
                 if company_name:
                     with st.spinner(f"Fetching company details for '{company_name}'..."):
-                        company_details = get_company_by_name(auth_headers, base_url, company_name)
+                        company_details = report_errors(connectwise.get_company_by_name(auth_headers, base_url, company_name))
                     if company_details:
                         st.session_state.company_id = company_details.get('id')
                     else:
@@ -617,14 +294,16 @@ def runbook_page():
                 st.error(f"Could not find ticket with ID: {st.session_state.current_ticket_id}.")
     
     if st.session_state.current_ticket_data:
-        ticket_data = st.session_state.current_ticket_data
-        site_name = ticket_data.get('site', {}).get('name')
-        priority_name = ticket_data.get('priority', {}).get('name')
         auth_headers, base_url = get_connectwise_auth_headers()
-        ticket_notes = get_connectwise_ticket_notes(auth_headers, base_url, st.session_state.current_ticket_id)
-        full_description = ''
-        if ticket_notes and len(ticket_notes) > 0 and 'text' in ticket_notes[0]:
-            full_description = ticket_notes[0]['text']
+        ticket_view = get_ticket_view(auth_headers, base_url, st.session_state.current_ticket_id)
+        if not ticket_view:
+            st.error(f"Could not load ticket {st.session_state.current_ticket_id}.")
+            return
+        st.session_state.current_ticket_data = ticket_view['ticket']
+        ticket_data = ticket_view['ticket']
+        site_name = ticket_view['site_name']
+        priority_name = ticket_view['priority_name']
+        full_description = ticket_view['full_description']
 
         with st.expander("View Full Ticket Description"):
             st.text_area("Ticket Notes", full_description, height=300)
@@ -636,11 +315,7 @@ def runbook_page():
             st.markdown(f"### **Site:**")
             st.write(f"{site_name}")
             if site_name == "Additional Site":
-                sites_continued_pattern = re.compile(r"Sites Continued:?\s*(.*)", re.IGNORECASE)
-                match = sites_continued_pattern.search(full_description)
-                new_site_name = None
-                if match:
-                    new_site_name = match.group(1).strip()
+                new_site_name = ticket_view['new_site_name']
                 if new_site_name:
                     st.markdown(f"The ticket description contains a new site name.")
                     st.markdown(f"**Current Site:** `Additional Site`")
@@ -661,72 +336,33 @@ def runbook_page():
             st.markdown(f"### **Priority:**")
             st.write(f"{priority_name}")
             st.markdown(f"### **Scheduling Details**")
-            if 'customFields' in ticket_data and isinstance(ticket_data['customFields'], list):
-                custom_fields_dict = {cf['caption']: cf.get('value') for cf in ticket_data['customFields']}
-                start_date_str = custom_fields_dict.get('Start Date of Request', None)
-                end_date_str = custom_fields_dict.get('End Date of Request', None)
-                start_date_display = start_date_str.split('T')[0] if start_date_str and 'T' in start_date_str else start_date_str
-                end_date_display = end_date_str.split('T')[0] if end_date_str and 'T' in end_date_str else end_date_str
-                start_time = custom_fields_dict.get('Start Time of Request', None)
-                end_time = custom_fields_dict.get('End Time of Request', None)
-                end_time_display = end_time
-                if start_date_str and end_date_str and start_time and not end_time:
-                    end_time_display = start_time
-
-                st.markdown(f"**Start Date of Request:** {start_date_display if start_date_display else 'None'}")
-                st.markdown(f"**Start Time of Request:** {start_time if start_time else 'None'}")
-                st.markdown(f"**End Date of Request:** {end_date_display if end_date_display else 'None'}")
-                st.markdown(f"**End Time of Request:** {end_time_display if end_time_display else 'None'}")
+            if ticket_view['scheduling_details'] is not None:
+                for label, value in ticket_view['scheduling_details']:
+                    st.markdown(f"**{label}:** {value if value else 'None'}")
             else:
                 st.info("No custom fields found for this ticket.")
 
         with col3:
             st.markdown("### **Scheduling Window**")
-            if 'customFields' in ticket_data and isinstance(ticket_data['customFields'], list):
-                custom_fields_dict = {cf['caption']: cf.get('value') for cf in ticket_data['customFields']}
-                start_date_str = custom_fields_dict.get('Start Date of Request', None)
-                start_time = custom_fields_dict.get('Start Time of Request', None)
-                end_date_str = custom_fields_dict.get('End Date of Request', None)
-                end_time = custom_fields_dict.get('End Time of Request', None)
-                start_date_obj = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d").date() if start_date_str else None
-                end_date_obj = datetime.strptime(end_date_str.split('T')[0], "%Y-%m-%d").date() if end_date_str else None
-                start_date_display = start_date_str.split('T')[0] if start_date_str else 'None'
-                end_date_display = end_date_str.split('T')[0] if end_date_str else 'None'
-                
-                if start_date_obj and end_date_obj and start_date_obj == end_date_obj:
-                    st.markdown(f"**Type:** Hard Start")
-                    st.markdown(f"The activity is a **hard start** for {start_date_display} at {start_time}.")
-                elif start_date_str and start_time and end_date_str and end_time:
-                    st.markdown(f"**Type:** Schedulable Window")
-                    st.markdown(f"The activity can be scheduled between {start_date_display} at {start_time} and {end_date_display} at {end_time}.")
-                elif start_date_str and start_time and end_date_str and not end_time:
-                    st.markdown(f"**Type:** Schedulable Window")
-                    st.markdown(f"The activity can be scheduled between {start_date_display} at {start_time} and {end_date_display} at {start_time}.")
-                elif start_date_str and start_time and not end_date_str and not end_time:
-                    st.markdown(f"**Type:** Hard Start")
-                    st.markdown(f"The activity is a **hard start** for {start_date_display} at {start_time}.")
-                elif priority_name in ["1 - Critical", "2 - High"] and not start_date_str and not start_time:
-                    st.markdown(f"**Type:** Hard Start (Deadline)")
-                    if end_date_str and end_time:
-                        st.markdown(f"Tech must be on site **before** {end_date_display} at {end_time}.")
-                    else:
-                        st.warning("Critical/High priority ticket with no clear deadline specified.")
-                else:
-                    st.info("No scheduling window details found.")
+            if ticket_view['scheduling_window'] is not None:
+                for kind, text in ticket_view['scheduling_window']:
+                    getattr(st, kind)(text)
             else:
                 st.info("No custom fields found for this ticket.")
         st.markdown("---")
         st.subheader("Available Badged Technicians")
-        site_name_from_ticket = ticket_data.get('site', {}).get('name')
-        site_code = site_name_from_ticket.split(' - ')[-1].strip() if site_name_from_ticket and ' - ' in site_name_from_ticket else site_name_from_ticket
+        site_code = ticket_view['site_code']
         if site_code and site_code != 'Additional Site':
             with st.spinner(f"Looking up badged technicians for site '{site_code}'..."):
-                tech_df = get_technicians_by_site(site_code)
+                tech_df = report_errors(technicians.load_site_roster(site_code))
                 st.session_state.tech_df = tech_df
             if tech_df is not None and not tech_df.empty:
                 st.dataframe(tech_df.drop('SURYL_EMAIL', axis=1), hide_index=True)
             else:
                 st.info(f"No badged technicians found for site code '{site_code}'.")
+            if st.button("Refresh Technician Roster"):
+                technicians.invalidate_site_roster(site_code)
+                st.rerun()
         else:
             st.warning("Could not determine a site code from the ticket.")
             st.session_state.tech_df = None
@@ -741,83 +377,38 @@ def runbook_page():
                 if send_note_button:
                     if not eta:
                         st.error("Please enter an ETA.")
+                    elif not dispatch.parse_eta(eta):
+                        st.error(dispatch.ETA_FORMAT_ERROR)
+                        return
                     else:
-                        try:
-                            parsed_datetime = datetime.strptime(eta.strip(), "%m/%d, %I:%M%p")
-                        except ValueError:
-                            try:
-                                parsed_datetime = datetime.strptime(eta.strip(), "%m/%d, %I%p")
-                            except ValueError:
-                                st.error("Invalid ETA format. Please use 'MM/DD, HPM' (e.g., '9/13, 1PM') or 'MM/DD, H:MM PM' (e.g., '8/12, 12:30PM').")
-                                return
-                        current_year = datetime.now().year
-                        start_datetime = parsed_datetime.replace(year=current_year)
-                        new_date_str = start_datetime.strftime("%A, %B %d, %Y")
-                        new_date_str = new_date_str.replace(" 0", " ")                        
-                        current_summary = st.session_state.current_ticket_data.get('summary', '')
-                        date_pattern = re.compile(r"(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday), (January|February|March|April|May|June|July|August|September|October|November|December) \d+, \d{4}")
-                        match = date_pattern.search(current_summary)
-                        if match:
-                            new_summary = date_pattern.sub(new_date_str, current_summary)
-                        else:
-                            new_summary = f"{current_summary} {new_date_str}"
-                        summary_payload = [{"op": "replace", "path": "summary", "value": new_summary}]
-                        with st.spinner("Updating ticket summary..."):
-                            summary_update_result = update_connectwise_ticket(auth_headers, base_url, st.session_state.current_ticket_id, summary_payload)
-                            if summary_update_result:
-                                st.success("Ticket summary updated successfully!")
-                            else:
-                                st.error("Failed to update the ticket summary.")                        
                         selected_tech = st.session_state.tech_df.loc[
                             (st.session_state.tech_df['FIRST_NAME'] + ' ' + st.session_state.tech_df['LAST_NAME']) == selected_tech_name].iloc[0]
-                        full_name = f"{selected_tech['FIRST_NAME']} {selected_tech['LAST_NAME']}"
-                        sury_email = selected_tech['SURYL_EMAIL']
-                        tech_id_to_send = selected_tech['FIELD_NATION_ID']
-                        
-                        note_text = (
-                            f"Name: {full_name}\n"
-                            f"Mail: {sury_email}\n"
-                            f"ETA: {eta}")
-                        with st.spinner("Adding discussion note to ticket..."):
-                            note_result = add_connectwise_ticket_note(auth_headers, base_url, st.session_state.current_ticket_id, note_text)
-                        
-                        if note_result:
-                            st.success(f"Discussion note added successfully to ticket {st.session_state.current_ticket_id}!")
-                            
-                            tech_id_payload = [
-                                {"op": "replace", "path": "customFields", "value": [
-                                {"id": 23, "caption": "Tech ID", "value": tech_id_to_send}]}]
-                            
-                            with st.spinner("Updating ticket with Tech ID..."):
-                                tech_id_update_result = update_connectwise_ticket(auth_headers, base_url, st.session_state.current_ticket_id, tech_id_payload)
-                                if tech_id_update_result:
-                                    st.success(f"Tech ID updated successfully!")
-                                else:
-                                    st.error("Failed to update the Tech ID.")
-
-                            with st.spinner("Updating ticket scheduling details..."):
-                                update_ticket_dates(eta, st.session_state.current_ticket_id)
-                            
-                            with st.spinner("Updating ticket status to Dispatched..."):
-                                board_id = st.session_state.current_ticket_data['board']['id']
-                                dispatched_status_object = get_status_by_name(auth_headers, base_url, board_id, "Dispatched")
-                                if dispatched_status_object:
-                                    status_update_result = update_connectwise_ticket_status(auth_headers, base_url, st.session_state.current_ticket_id, dispatched_status_object)
-                                    if status_update_result:
-                                        st.success(f"Ticket status updated to 'Dispatched'!")
-                                    else:
-                                        st.error("Failed to update the ticket status.")
-                                else:
-                                    st.error("Could not find 'Dispatched' status on this board.")
-                            st.rerun()
-                        else:
-                            st.error("Failed to add discussion note to ticket.")
+                        invalidate_ticket_view(st.session_state.current_ticket_id)
+                        with st.spinner("Sending discussion note and updating ticket..."):
+                            st.session_state.dispatch_outcome = dispatch.dispatch_ticket(
+                                auth_headers,
+                                base_url,
+                                st.session_state.current_ticket_id,
+                                st.session_state.current_ticket_data,
+                                selected_tech.to_dict(),
+                                eta)
+                        st.rerun()
+            dispatch_outcome = st.session_state.pop('dispatch_outcome', None)
+            if dispatch_outcome:
+                if dispatch_outcome['ok']:
+                    st.success(f"Ticket {st.session_state.current_ticket_id} dispatched: note added, summary, Tech ID, scheduling details and status updated.")
+                else:
+                    completed_steps = [step for step, succeeded in dispatch_outcome['steps'].items() if succeeded]
+                    if completed_steps:
+                        st.warning(f"Partially dispatched. Completed: {', '.join(completed_steps)}.")
+                    for error in dispatch_outcome['errors']:
+                        st.error(error)
     
     if st.session_state.site_change_initiated and st.session_state.current_ticket_data:
         auth_headers, base_url = get_connectwise_auth_headers()
         if auth_headers and base_url and st.session_state.new_site_name and st.session_state.company_id:
             st.info("Searching for the correct site in ConnectWise...")
-            site_details = get_site_by_name(auth_headers, base_url, st.session_state.company_id, st.session_state.new_site_name)
+            site_details = report_errors(connectwise.get_site_by_name(auth_headers, base_url, st.session_state.company_id, st.session_state.new_site_name))
             if site_details:
                 site_id = site_details.get('id')
                 st.info(f"Found site: '{site_details['name']}' (ID: {site_id}). Now updating ticket {st.session_state.current_ticket_id}...")
@@ -826,8 +417,9 @@ def runbook_page():
                     "id": site_id,
                     "name": site_details['name']}}]
                 with st.spinner("Submitting site change to ConnectWise..."):
-                    updated_ticket = update_connectwise_ticket(auth_headers, base_url, st.session_state.current_ticket_id, update_payload)
+                    updated_ticket = report_errors(connectwise.update_connectwise_ticket(auth_headers, base_url, st.session_state.current_ticket_id, update_payload))
                 if updated_ticket:
+                    invalidate_ticket_view(st.session_state.current_ticket_id)
                     st.success(f"Ticket **{st.session_state.current_ticket_id}** updated successfully! Reloading page to show changes.")
                     st.session_state.new_site_name = None
                     st.session_state.site_change_initiated = False
@@ -844,6 +436,136 @@ def runbook_page():
 
 # ------------------------------------------------- TICKET INPUT PAGE -------------------------------------------------   
 
+def get_all_technicians():
+    approved_technicians = [
+        {'first_name': 'Mike', 'last_name': 'Sears'},
+        {'first_name': 'Chaz', 'last_name': 'Crommartie'}]
+    return approved_technicians
+def bulk_close_out_section(auth_headers, base_url, live_dispatch_writer):
+    with st.form("bulk_close_out_search_form"):
+        ticket_ids_input = st.text_area("ConnectWise Ticket IDs (one per line or comma separated):", height=150)
+        fetch_button = st.form_submit_button("Fetch Tickets")
+    if fetch_button:
+        ticket_ids = list(dict.fromkeys(ticket_id for ticket_id in re.split(r"[\s,]+", ticket_ids_input) if ticket_id))
+        if not ticket_ids:
+            st.error("Please enter at least one ticket ID.")
+            return
+        with st.spinner(f"Fetching {len(ticket_ids)} tickets and their notes..."):
+            close_out_rows, missing_ids = report_errors(closeout.fetch_close_out_rows(auth_headers, base_url, ticket_ids))
+        if missing_ids:
+            st.warning(f"Could not find tickets: {', '.join(missing_ids)}")
+        st.session_state.close_out_df = pd.DataFrame(close_out_rows, columns=closeout.CLOSE_OUT_COLUMNS)
+        st.session_state.close_out_results = None
+    close_out_df = st.session_state.get('close_out_df')
+    if close_out_df is None or close_out_df.empty:
+        return
+    st.markdown("---")
+    st.subheader(f"Close Out {len(close_out_df)} Tickets")
+    edited_df = st.data_editor(
+        close_out_df,
+        hide_index=True,
+        disabled=['SURYLID', 'HPID', 'Site', 'Priority', 'SLA', 'Type', 'Subtype', 'Item'],
+        column_config={
+            'Date': st.column_config.DateColumn('Date'),
+            'CheckInDate': st.column_config.DateColumn('Check-In Date'),
+            'CheckOutDate': st.column_config.DateColumn('Check-Out Date'),
+            'Hours': st.column_config.NumberColumn('Hours', min_value=0.0, step=0.5),
+            'Multiplier': st.column_config.NumberColumn('Multiplier', min_value=1.0, step=0.5),
+            'Actions Taken': st.column_config.TextColumn('Actions Taken', width="large")},
+        key="close_out_editor")
+    if st.button("Submit All & Send Notes"):
+        incomplete_ids = edited_df.loc[(edited_df['Tech'].fillna('').str.strip() == '') | edited_df['CheckInDate'].isna(), 'SURYLID'].tolist()
+        if incomplete_ids:
+            st.error(f"Please fill in a technician and check-in date for tickets: {', '.join(incomplete_ids)}")
+            return
+        if not live_dispatch_writer:
+            st.error("Skipping resolution notes as Supabase is not configured.")
+            return
+        close_out_records = edited_df.to_dict('records')
+        rows_to_insert = [{
+            'Date': closeout.to_iso_date(record['Date']),
+            'Tech': record['Tech'].strip(),
+            'SLA': record['SLA'],
+            'Site': record['Site'],
+            'Hours': float(record['Hours']),
+            'CheckInDate': closeout.to_iso_date(record['CheckInDate']),
+            'CheckInTime': record['CheckInTime'],
+            'CheckOutDate': closeout.to_iso_date(record['CheckOutDate']),
+            'CheckOutTime': record['CheckOutTime'],
+            'HPID': record['HPID'],
+            'SURYLID': record['SURYLID'],
+            'Multiplier': float(record['Multiplier']),
+            'Priority': record['Priority'],
+            'Type': record['Type'],
+            'Subtype': record['Subtype'],
+            'Item': record['Item']} for record in close_out_records]
+        with st.spinner(f"Logging {len(rows_to_insert)} rows to `live_dispatches`..."):
+            insert_outcome = live_dispatch_writer.submit(rows_to_insert)
+        for error in insert_outcome['errors']:
+            st.error(error)
+        skipped_ids = set(insert_outcome['rejected']) | set(insert_outcome['duplicates'])
+        note_records = [record for record in close_out_records if record['SURYLID'] not in skipped_ids]
+        limiter = connectwise.get_connectwise_rate_limiter(base_url)
+        def send_resolution_note(record):
+            limiter.wait()
+            note_text = closeout.build_resolution_note(
+                pd.Timestamp(record['CheckInDate']).date(),
+                record['CheckInTime'],
+                record['CheckOutTime'] or "",
+                float(record['Hours']),
+                record['Actions Taken'])
+            return connectwise.add_connectwise_resolution_note(auth_headers, base_url, record['SURYLID'], note_text)
+        with st.spinner(f"Sending {len(note_records)} resolution notes to ConnectWise..."):
+            with runtime.thread_pool(runtime.get_setting("close_out_max_workers", closeout.CLOSE_OUT_MAX_WORKERS)) as executor:
+                note_results = dict(zip([record['SURYLID'] for record in note_records], executor.map(send_resolution_note, note_records)))
+        for note_result in note_results.values():
+            report_errors(note_result)
+        logged_status = {surylid: "Logged" for surylid in insert_outcome['inserted']}
+        logged_status.update({surylid: "Already logged" for surylid in insert_outcome['duplicates']})
+        logged_status.update({surylid: "Rejected" for surylid in insert_outcome['rejected']})
+        logged_status.update({surylid: "Queued for retry" for surylid in insert_outcome['queued']})
+        st.session_state.close_out_results = pd.DataFrame([{
+            'SURYLID': record['SURYLID'],
+            'live_dispatches': logged_status.get(record['SURYLID'], "Queued for retry"),
+            'Resolution Note': "Skipped" if record['SURYLID'] not in note_results else "Sent" if note_results[record['SURYLID']].ok else "Failed"} for record in close_out_records])
+        remaining_df = edited_df[edited_df['SURYLID'].isin(insert_outcome['rejected'])].reset_index(drop=True)
+        st.session_state.close_out_df = remaining_df if not remaining_df.empty else None
+        st.session_state.pop('close_out_editor', None)
+    close_out_results = st.session_state.get('close_out_results')
+    if close_out_results is not None:
+        st.subheader("Close-Out Results")
+        st.dataframe(close_out_results, hide_index=True)
+def billing_audit_section():
+    st.write("Recompute SLA and multiplier for every `live_dispatches` row with the current billing rules and list the rows that differ.")
+    if st.button("Run Billing Audit"):
+        supabase = report_errors(supabase_client.create_supabase_client())
+        if not supabase:
+            return
+        with st.spinner("Loading `live_dispatches`..."):
+            dispatches_df = report_errors(live_dispatches.load_live_dispatches(supabase))
+        if dispatches_df is None:
+            return
+        if dispatches_df.empty:
+            st.info("No rows found in `live_dispatches`.")
+            return
+        recompute_started = monotonic()
+        recomputed_df = rules.recompute_dispatch_billing(dispatches_df)
+        recompute_seconds = monotonic() - recompute_started
+        stored_multiplier = pd.to_numeric(dispatches_df['Multiplier'], errors='coerce')
+        changed = (recomputed_df['SLA'] != dispatches_df['SLA']) | (recomputed_df['Multiplier'] != stored_multiplier)
+        audit_df = dispatches_df.loc[changed, ['SURYLID', 'Site', 'Priority', 'CheckInDate', 'CheckInTime', 'SLA', 'Multiplier']].assign(
+            **{'Recomputed SLA': recomputed_df.loc[changed, 'SLA'], 'Recomputed Multiplier': recomputed_df.loc[changed, 'Multiplier']})
+        st.caption(f"Recomputed {len(dispatches_df)} rows in {recompute_seconds * 1000:.0f} ms.")
+        if audit_df.empty:
+            st.success("Every row matches the current billing rules.")
+        else:
+            st.warning(f"{len(audit_df)} rows differ from the current billing rules.")
+            st.dataframe(audit_df, hide_index=True)
+            st.download_button(
+                label="Download Billing Audit",
+                data=audit_df.to_csv(index=False),
+                file_name="live_dispatches_billing_audit.csv",
+                mime="text/csv")
 def input_tickets_page():
     st.title("Input Tickets and Log Data")
     st.write("Enter a ConnectWise ticket ID to pre-fill the form, then submit the data to the `live_dispatches` table.")
@@ -854,8 +576,15 @@ def input_tickets_page():
     if 'actions_taken' not in st.session_state:
         st.session_state.actions_taken = ""
     auth_headers, base_url = get_connectwise_auth_headers()
-    supabase = create_supabase_client()
+    live_dispatch_writer = report_errors(live_dispatches.get_live_dispatch_writer())
     hardcoded_technicians = get_all_technicians()
+    input_mode = st.radio("Mode", ["Single Ticket", "Bulk Close-Out", "Billing Audit"], horizontal=True)
+    if input_mode == "Bulk Close-Out":
+        bulk_close_out_section(auth_headers, base_url, live_dispatch_writer)
+        return
+    if input_mode == "Billing Audit":
+        billing_audit_section()
+        return
     with st.form("search_ticket_form"):
         col1, col2 = st.columns([3, 1])
         with col1:
@@ -865,76 +594,19 @@ def input_tickets_page():
             fetch_button = st.form_submit_button("Fetch Details")
     if fetch_button and ticket_id_to_search:
         with st.spinner(f"Fetching details for ticket {ticket_id_to_search}..."):
-            ticket_data = get_connectwise_single_ticket(auth_headers, base_url, ticket_id_to_search)
-            ticket_notes = get_connectwise_ticket_notes(auth_headers, base_url, ticket_id_to_search)
+            ticket_data = report_errors(connectwise.get_connectwise_single_ticket(auth_headers, base_url, ticket_id_to_search, fields=connectwise.INPUT_TICKET_FIELDS))
+            ticket_notes = report_errors(connectwise.get_connectwise_ticket_notes(auth_headers, base_url, ticket_id_to_search))
             if ticket_data and ticket_notes:
-                flattened_ticket_list = flatten_ticket_data([ticket_data], auth_headers, base_url)
-                if flattened_ticket_list:
-                    flattened_ticket = flattened_ticket_list[0]
-                    hp_now_ticket_number = flattened_ticket.get('HP Now Ticket #', 'N/A')
-                    sla_calculated = flattened_ticket.get('SLA', 'N/A')
-                    technician_name = flattened_ticket.get('CW-Technician Name (Custom Field)', '').strip()
-                    total_hours_str = flattened_ticket.get('CW-Total Hours (Custom Field)')
-                    hours_from_cw = 0.0
-                    if total_hours_str:
-                        try:
-                            hours_from_cw = float(total_hours_str)
-                        except ValueError:
-                            hours_from_cw = 0.0
-                    check_in_cw_str = flattened_ticket.get('CW-Check-In (Custom Field)')
-                    check_out_cw_str = flattened_ticket.get('CW-Check-Out (Custom Field)')
-                    check_in_date_obj, check_in_time_str = parse_cw_timestamp(check_in_cw_str)
-                    check_out_date_obj, check_out_time_str = parse_cw_timestamp(check_out_cw_str)
-                    def safe_time_parse(time_str):
-                        if not time_str:
-                            return None
-                        formats = ["%I:%M %p", "%H:%M"]
-                        for fmt in formats:
-                            try:
-                                return datetime.strptime(time_str, fmt).time()
-                            except ValueError:
-                                continue
-                        return None
-                    check_in_time_obj = safe_time_parse(check_in_time_str) if check_in_time_str else None
-                    multiplier_calculated = 1.0
-                    if check_in_date_obj and check_in_time_obj:
-                        multiplier_calculated = calculate_multiplier(check_in_date_obj, check_in_time_obj)
-                    actions_taken = extract_actions_taken(find_field_nation_internal_note(ticket_notes))
-                else:
-                    hp_now_ticket_number = 'N/A'
-                    technician_name = ''
-                    sla_calculated = 'N/A'
-                    hours_from_cw = 0.0
-                    check_in_date_obj, check_in_time_str = None, None
-                    check_out_date_obj, check_out_time_str = None, None
-                    multiplier_calculated = 1.0
-                    actions_taken = "No provider notes found in the ticket's internal notes."
+                close_out_row = closeout.build_close_out_row(ticket_data, ticket_notes, auth_headers, base_url)
+                actions_taken = close_out_row.pop('Actions Taken')
                 st.success(f"Ticket {ticket_id_to_search} details fetched successfully.")
                 st.session_state.input_ticket_id = ticket_id_to_search
-                site_name = ticket_data.get('site', {}).get('name', 'N/A')
-                priority = ticket_data.get('priority', {}).get('name', 'N/A')
-                st.session_state.ticket_form_data = {
-                    'HPID': hp_now_ticket_number,
-                    'SURYLID': str(ticket_id_to_search),
-                    'Site': site_name,
-                    'Priority': priority,
-                    'Date': date.today(),
-                    'Tech': technician_name,
-                    'SLA': sla_calculated,
-                    'Hours': hours_from_cw,
-                    'CheckInDate': check_in_date_obj if check_in_date_obj else date.today(),
-                    'CheckInTime': check_in_time_str if check_in_time_str else "09:00 AM",
-                    'CheckOutDate': check_out_date_obj,
-                    'CheckOutTime': check_out_time_str,
-                    'Multiplier': multiplier_calculated,
-                    'Type': flattened_ticket.get('Type', 'N/A'),
-                    'Subtype': flattened_ticket.get('Subtype', 'N/A'),
-                    'Item': flattened_ticket.get('Item', 'N/A')}
+                st.session_state.ticket_form_data = close_out_row
                 st.session_state.actions_taken = actions_taken
             else:
                 st.error(f"Could not find ticket with ID: {ticket_id_to_search} or notes. Please try again.")
                 st.session_state.ticket_form_data = None
-                st.session_state.actions_taken = "No provider notes found in the ticket's internal notes."
+                st.session_state.actions_taken = notes.NO_PROVIDER_NOTES
     if st.session_state.ticket_form_data:
         st.markdown("---")
         st.subheader(f"Log Data for ConnectWise Ticket {st.session_state.input_ticket_id}")
@@ -965,14 +637,7 @@ def input_tickets_page():
                 check_out_time_str = st.text_input("Check-Out Time (HH:MM AM/PM)", value=form_data['CheckOutTime'] if form_data['CheckOutTime'] else "")
             st.markdown("---")
             st.subheader("Resolution Note for Customer")
-            note_content = (
-                f"Date of Visit: {check_in_date.strftime('%Y-%m-%d')}\n"
-                f"Start Time: {check_in_time_str}\n"
-                f"End Time: {check_out_time_str}\n"
-                f"Time in Hours: {hours}\n"
-                f"End User Notified: Yes\n\n"
-                f"Actions Taken:\n"
-                f"{st.session_state.actions_taken}")
+            note_content = closeout.build_resolution_note(check_in_date, check_in_time_str, check_out_time_str, hours, st.session_state.actions_taken)
             edited_note = st.text_area("Resolution Note for Customer:", value=note_content, height=300)
             submit_combined_button = st.form_submit_button("Submit & Send Note")
             if submit_combined_button:
@@ -1000,22 +665,27 @@ def input_tickets_page():
                     'Subtype': form_data['Subtype'],
                     'Item': form_data['Item']}
                 supabase_success = False
-                if supabase:
+                if live_dispatch_writer:
                     with st.spinner("Inserting data into Supabase..."):
-                        try:
-                            response = supabase.table('live_dispatches').insert([data_to_insert]).execute()
-                            st.success("Data successfully logged to `live_dispatches`!")
-                            st.json(data_to_insert)
-                            supabase_success = True
-                        except Exception as e:
-                            st.error(f"Failed to insert data into Supabase: {e}")
+                        insert_outcome = live_dispatch_writer.submit([data_to_insert])
+                    if insert_outcome['inserted']:
+                        st.success("Data successfully logged to `live_dispatches`!")
+                        st.json(data_to_insert)
+                    elif insert_outcome['duplicates']:
+                        st.info(f"Ticket {data_to_insert['SURYLID']} is already logged in `live_dispatches`; skipping the duplicate row.")
+                    elif insert_outcome['rejected']:
+                        for error in insert_outcome['errors']:
+                            st.error(error)
+                    else:
+                        st.warning(f"Supabase is unavailable ({live_dispatch_writer.stats()['Last Error']}). The row was saved to the local retry queue and will be logged automatically.")
+                    supabase_success = not insert_outcome['rejected']
                 if supabase_success:
                     with st.spinner("Sending resolution note to ConnectWise..."):
-                        resolution_result = add_connectwise_resolution_note(
+                        resolution_result = report_errors(connectwise.add_connectwise_resolution_note(
                             auth_headers, 
                             base_url, 
                             st.session_state.input_ticket_id, 
-                            edited_note)
+                            edited_note))
                     if resolution_result:
                         st.success(f"Resolution note successfully added to ticket {st.session_state.input_ticket_id}!")
                         st.session_state.ticket_form_data = None
@@ -1026,16 +696,135 @@ def input_tickets_page():
                 else:
                     st.error("Skipping resolution note as Supabase insertion failed.")
 
+# ------------------------------------------------- BULK DISPATCH PAGE -------------------------------------------------
+
+BULK_DISPATCH_MAX_WORKERS = 4
+
+def parse_bulk_dispatch_csv(uploaded_file):
+    df = pd.read_csv(uploaded_file, dtype=str).fillna('')
+    df.columns = [column.strip().lower() for column in df.columns]
+    missing_columns = [column for column in dispatch.BULK_DISPATCH_COLUMNS if column not in df.columns]
+    if missing_columns:
+        st.error(f"CSV is missing required columns: {', '.join(missing_columns)}")
+        return pd.DataFrame(columns=dispatch.BULK_DISPATCH_COLUMNS)
+    return df[dispatch.BULK_DISPATCH_COLUMNS].apply(lambda column: column.str.strip())
+def bulk_dispatch_page():
+    st.title("Bulk Dispatch")
+    st.write("Dispatch many tickets in one run. Enter one `ticket_id, tech, eta` per line, or upload a CSV with those columns. The technician can be a full name or Field Nation ID and must be badged for the ticket's site.")
+    with st.form("bulk_dispatch_form"):
+        pasted_rows = st.text_area("Tickets to dispatch:", height=200, placeholder="1234567, Mike Sears, 9/13, 1PM")
+        uploaded_file = st.file_uploader("Or upload a CSV", type=["csv"])
+        max_workers = st.number_input("Concurrent dispatches", min_value=1, max_value=16, value=runtime.get_setting("bulk_dispatch_max_workers", BULK_DISPATCH_MAX_WORKERS))
+        dispatch_button = st.form_submit_button("Dispatch Tickets")
+    if dispatch_button:
+        dispatch_df = parse_bulk_dispatch_csv(uploaded_file) if uploaded_file else dispatch.parse_bulk_dispatch_text(pasted_rows)
+        dispatch_df = dispatch_df.drop_duplicates(subset='ticket_id', keep='last')
+        if dispatch_df.empty:
+            st.error("Please enter at least one ticket to dispatch.")
+            return
+        auth_headers, base_url = get_connectwise_auth_headers()
+        if not auth_headers or not base_url:
+            return
+        dispatch_rows = dispatch_df.to_dict('records')
+        bulk_dispatch_job = jobs.get_job_runner().submit(
+            ("bulk_dispatch", base_url, tuple((row['ticket_id'], row['tech'], row['eta']) for row in dispatch_rows)),
+            f"Bulk dispatch of {len(dispatch_rows)} tickets",
+            dispatch.bulk_dispatch_tickets,
+            auth_headers,
+            base_url,
+            dispatch_rows,
+            int(max_workers),
+            technicians.load_site_roster)
+        st.session_state.bulk_dispatch_job_id = bulk_dispatch_job.id
+    bulk_dispatch_job = get_session_job('bulk_dispatch_job_id')
+    if bulk_dispatch_job and not bulk_dispatch_job.done:
+        job_progress(bulk_dispatch_job.id)
+        return
+    if bulk_dispatch_job and st.session_state.get('bulk_dispatch_results_job_id') != bulk_dispatch_job.id:
+        st.session_state.bulk_dispatch_results_job_id = bulk_dispatch_job.id
+        st.session_state.bulk_dispatch_results = report_errors(bulk_dispatch_job.result)
+        if st.session_state.bulk_dispatch_results is not None:
+            for ticket_id in st.session_state.bulk_dispatch_results['Ticket ID']:
+                invalidate_ticket_view(ticket_id)
+    results_df = st.session_state.get('bulk_dispatch_results')
+    if results_df is not None and not results_df.empty:
+        st.subheader("Results")
+        result_counts = results_df['Result'].value_counts()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Dispatched", int(result_counts.get('Dispatched', 0)))
+        col2.metric("Partial", int(result_counts.get('Partial', 0)))
+        col3.metric("Failed", int(result_counts.get('Failed', 0)))
+        st.dataframe(results_df, hide_index=True)
+        st.download_button(
+            label="Download Results",
+            data=results_df.to_csv(index=False),
+            file_name=f"bulk_dispatch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv")
+
 # ------------------------------------------------- MAIN APP LOGIC -------------------------------------------------
 
 PAGES = {
     "Landing Page": landing_page,
     "ConnectWise API": connectwise_page,
     "DXC Runbook": runbook_page,
+    "Bulk Dispatch": bulk_dispatch_page,
     "Input Tickets": input_tickets_page,}
 st.sidebar.title("Navigation")
 page_selection = st.sidebar.radio("Go to", list(PAGES.keys()))
+with st.sidebar.expander("ConnectWise API Latency"):
+    latency_stats = connectwise.get_connectwise_client().latency_stats()
+    if latency_stats:
+        st.dataframe(pd.DataFrame(latency_stats), hide_index=True)
+    else:
+        st.write("No ConnectWise calls recorded yet.")
+with st.sidebar.expander("Reference Data Cache"):
+    reference_cache = connectwise.get_reference_cache()
+    st.dataframe(pd.DataFrame([reference_cache.stats()]), hide_index=True)
+    if st.button("Clear Reference Cache"):
+        reference_cache.clear()
+        st.success("Boards, statuses, companies and sites will be refetched.")
+with st.sidebar.expander("Background Jobs"):
+    job_stats = jobs.get_job_runner().stats()
+    if job_stats:
+        st.dataframe(pd.DataFrame(job_stats), hide_index=True)
+    else:
+        st.write("No background jobs yet.")
+with st.sidebar.expander("Live Dispatch Queue"):
+    live_dispatch_writer = report_errors(live_dispatches.get_live_dispatch_writer())
+    if live_dispatch_writer:
+        st.dataframe(pd.DataFrame([live_dispatch_writer.stats()]), hide_index=True)
+        rejected_rows = live_dispatch_writer.rejected_rows()
+        if rejected_rows:
+            st.caption(f"Rows Supabase rejected are not retried. They are kept in `{live_dispatch_writer.rejected_path}`.")
+            st.dataframe(pd.DataFrame(rejected_rows), hide_index=True)
+        if st.button("Retry Queued Rows"):
+            with st.spinner("Retrying queued `live_dispatches` rows..."):
+                retry_outcome = live_dispatch_writer.flush()
+            st.success(f"Logged {len(retry_outcome['inserted'])} rows; {len(retry_outcome['queued'])} still queued.")
 
+start_render_metrics(page_selection)
 PAGES[page_selection]()
+render_metrics = current_render_metrics()
+if render_metrics is not None:
+    with st.sidebar.expander("Debug: This Page Render"):
+        metric_rows = render_metrics.rows()
+        if metric_rows:
+            st.dataframe(pd.DataFrame(metric_rows), hide_index=True)
+            for kind, operation, count in render_metrics.repeated_calls():
+                st.warning(f"Possible N+1: `{operation}` ({kind}) was called {count} times in this render.")
+        else:
+            st.write("No calls recorded in this render.")
+        st.download_button("Download JSON", data=render_metrics.to_json(), file_name="dxc_render_metrics.json", mime="application/json")
+        st.download_button("Download Prometheus", data=render_metrics.to_prometheus(), file_name="dxc_render_metrics.prom", mime="text/plain")
+    session_jobs = [job for job in (get_session_job('report_job_id'), get_session_job('bulk_dispatch_job_id')) if job]
+    if session_jobs:
+        with st.sidebar.expander("Debug: Background Jobs"):
+            for job in session_jobs:
+                st.caption(f"{job.description} ({job.state})")
+                job_metric_rows = job.metrics.rows()
+                if job_metric_rows:
+                    st.dataframe(pd.DataFrame(job_metric_rows), hide_index=True)
+                else:
+                    st.write("No calls recorded yet.")
 
 
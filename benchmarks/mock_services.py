@@ -0,0 +1,233 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+CONNECTWISE_PREFIX = "/v4_6_release/apis/3.0"
+POSTGREST_PREFIX = "/rest/v1/"
+BOARD = {"id": 1, "name": "DXCSupport"}
+STATUSES = [{"id": 10, "name": "New"}, {"id": 11, "name": "Dispatched"}]
+COMPANY = {"id": 5, "name": "HP"}
+SITES = ["Alpha - AQN", "Beta - XYZ", "Gamma - SDG", "Additional Site"]
+SITE_CODES = ["AQN", "XYZ", "SDG"]
+PRIORITIES = ["Priority 1 - Critical", "Priority 2 - High", "Priority 3 - Medium", "Priority 4 - Low"]
+TECHS_PER_SITE = 40
+FIRST_TICKET_DATE = datetime(2024, 1, 1)
+CONDITION_PATTERN = re.compile(r'([\w/]+)\s*(>=|<=|=)\s*"?([^"\s]+)"?')
+TICKET_PATH_PATTERN = re.compile(r"/service/tickets/(\d+)(/notes)?")
+ID_SEGMENT_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+def make_ticket(ticket_id):
+    entered = (FIRST_TICKET_DATE + timedelta(minutes=ticket_id)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    site_name = SITES[ticket_id % len(SITES)]
+    return {
+        "id": ticket_id,
+        "summary": f"Ticket {ticket_id} Monday, January 1, 2024",
+        "board": dict(BOARD),
+        "status": dict(STATUSES[0]),
+        "company": dict(COMPANY),
+        "site": {"id": 7, "name": site_name},
+        "siteName": site_name,
+        "priority": {"id": 2, "name": PRIORITIES[ticket_id % len(PRIORITIES)]},
+        "type": {"id": 1, "name": "Break Fix"},
+        "subType": {"id": 2, "name": "Desktop"},
+        "item": {"id": 3, "name": "Dispatch"},
+        "dateEntered": entered,
+        "recordType": "ServiceTicket",
+        "severity": "Medium",
+        "impact": "Medium",
+        "team": {"id": 25, "name": "Field Services", "_info": {"team_href": f"{CONNECTWISE_PREFIX}/service/boards/1/teams/25"}},
+        "owner": {"id": 140, "identifier": "dispatch", "_info": {"member_href": f"{CONNECTWISE_PREFIX}/system/members/140"}},
+        "contact": {"id": 3100 + ticket_id % 50, "name": f"Contact {ticket_id % 50}", "_info": {"contact_href": f"{CONNECTWISE_PREFIX}/company/contacts/{3100 + ticket_id % 50}"}},
+        "contactName": f"Contact {ticket_id % 50}",
+        "contactPhoneNumber": "5550100200",
+        "contactEmailAddress": f"contact{ticket_id % 50}@example.com",
+        "addressLine1": f"{ticket_id % 900 + 100} Main Street",
+        "city": "Houston",
+        "stateIdentifier": "TX",
+        "zip": "77001",
+        "country": {"id": 1, "name": "United States", "_info": {"country_href": f"{CONNECTWISE_PREFIX}/company/countries/1"}},
+        "serviceLocation": {"id": 2, "name": "On-Site", "_info": {"location_href": f"{CONNECTWISE_PREFIX}/service/locations/2"}},
+        "source": {"id": 4, "name": "Email Connector", "_info": {"source_href": f"{CONNECTWISE_PREFIX}/service/sources/4"}},
+        "approved": True,
+        "closedFlag": False,
+        "budgetHours": 2.0,
+        "actualHours": 0.0,
+        "estimatedExpenseCost": 0.0,
+        "estimatedTimeCost": 0.0,
+        "customFields": [
+            {"id": 1, "caption": "Check-In", "value": "2024-01-02 08:15:00"},
+            {"id": 2, "caption": "Check-Out", "value": "2024-01-02 10:15:00"},
+            {"id": 3, "caption": "Total Hours", "value": "2"},
+            {"id": 4, "caption": "Technician Name", "value": "Mike Sears"},
+            {"id": 9, "caption": "Start Date of Request", "value": "2024-01-03T00:00:00Z"},
+            {"id": 10, "caption": "Start Time of Request", "value": "8am"},
+            {"id": 23, "caption": "Tech ID", "value": None}],
+        "_info": {
+            "lastUpdated": entered,
+            "updatedBy": "benchmark",
+            "dateEntered": entered,
+            "enteredBy": "FieldNationAPI",
+            "activities_href": f"{CONNECTWISE_PREFIX}/sales/activities?conditions=ticket/id={ticket_id}",
+            "timeentries_href": f"{CONNECTWISE_PREFIX}/time/entries?conditions=chargeToType=%22ServiceTicket%22%20AND%20chargeToId={ticket_id}",
+            "notes_href": f"{CONNECTWISE_PREFIX}/service/tickets/{ticket_id}/notes",
+            "documents_href": f"{CONNECTWISE_PREFIX}/system/documents?recordType=Ticket&recordId={ticket_id}"}}
+def make_notes(ticket_id, notes_per_ticket):
+    notes = [{
+        "id": ticket_id * 100,
+        "text": f"Issue reported. HP Now Ticket # INC{ticket_id:07d}\nSites Continued: Alpha - AQN\nProvider's closing notes: replaced part {ticket_id}",
+        "createdBy": "FieldNationAPI",
+        "internalAnalysisFlag": True}]
+    notes += [{"id": ticket_id * 100 + index, "text": f"Follow-up note {index}", "createdBy": "tech"} for index in range(1, notes_per_ticket)]
+    return notes
+def project(ticket, fields):
+    if not fields:
+        return ticket
+    projected = {}
+    for field in fields.split(","):
+        top, _, sub = field.partition("/")
+        if top not in ticket:
+            continue
+        if sub:
+            projected.setdefault(top, {})[sub] = ticket[top].get(sub)
+        else:
+            projected[top] = ticket[top]
+    return projected
+def filter_tickets(tickets, conditions):
+    for field, operator, value in CONDITION_PATTERN.findall(conditions or ""):
+        if field == "board/id":
+            tickets = [ticket for ticket in tickets if str(ticket["board"]["id"]) == value]
+        elif field == "dateEntered" and operator == ">=":
+            tickets = [ticket for ticket in tickets if ticket["dateEntered"] >= value]
+        elif field == "dateEntered" and operator == "<=":
+            tickets = [ticket for ticket in tickets if ticket["dateEntered"] <= value]
+        elif field == "lastUpdated":
+            tickets = [ticket for ticket in tickets if ticket["_info"]["lastUpdated"] >= value]
+    return tickets
+
+class MockState:
+    def __init__(self, ticket_count=100, notes_per_ticket=1, latency_seconds=0.0, max_page_size=1000):
+        self.lock = threading.Lock()
+        self.reset(ticket_count, notes_per_ticket, latency_seconds, max_page_size)
+    def reset(self, ticket_count, notes_per_ticket=1, latency_seconds=0.0, max_page_size=1000):
+        with self.lock:
+            self.latency_seconds = latency_seconds
+            self.max_page_size = max_page_size
+            self.tickets = {ticket_id: make_ticket(ticket_id) for ticket_id in range(1, ticket_count + 1)}
+            self.ticket_list = list(self.tickets.values())
+            self.notes = {ticket_id: make_notes(ticket_id, notes_per_ticket) for ticket_id in self.tickets}
+            technicians = [(f"Tech{number}", f"Person{number}", site_code) for number in range(TECHS_PER_SITE) for site_code in SITE_CODES]
+            self.tables = {
+                "names_and_sites": [{"Name": f"{first} {last}", "Site": site_code, "Badge": "YES"} for first, last, site_code in technicians],
+                "TECH INFORMATION": [
+                    {"FIRST_NAME": first, "LAST_NAME": last, "PHONE_NUMBER": "555-0100", "FIELD_NATION_ID": 1000 + index, "SURYL_EMAIL": f"{first.lower()}@example.com", "SITE": site_code}
+                    for index, (first, last, site_code) in enumerate(technicians)],
+                "live_dispatches": []}
+            self.calls = {}
+    def count_call(self, endpoint):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+    def take_calls(self):
+        with self.lock:
+            calls, self.calls = self.calls, {}
+        return calls
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        def log_message(self, *args):
+            pass
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"null")
+        def handle_request(self, method):
+            if state.latency_seconds:
+                time.sleep(state.latency_seconds)
+            parsed = urlparse(self.path)
+            path = unquote(parsed.path)
+            query = parse_qs(parsed.query)
+            state.count_call(f"{method} {ID_SEGMENT_PATTERN.sub('/{id}', path)}")
+            if path.startswith(POSTGREST_PREFIX):
+                return self.handle_postgrest(method, path[len(POSTGREST_PREFIX):], query)
+            if path.startswith(CONNECTWISE_PREFIX):
+                return self.handle_connectwise(method, path[len(CONNECTWISE_PREFIX):], {key: values[-1] for key, values in query.items()})
+            return self.send_json({"message": "unknown endpoint"}, 404)
+        def handle_connectwise(self, method, path, query):
+            if path == "/service/boards":
+                return self.send_json([BOARD])
+            if re.fullmatch(r"/service/boards/\d+/statuses", path):
+                return self.send_json(STATUSES)
+            if path == "/company/companies":
+                return self.send_json([COMPANY])
+            if re.fullmatch(r"/company/companies/\d+/sites", path):
+                return self.send_json([{"id": 7, "name": site_name} for site_name in SITES])
+            if path == "/service/tickets/count":
+                return self.send_json({"count": len(filter_tickets(state.ticket_list, query.get("conditions")))})
+            if path == "/service/tickets":
+                tickets = filter_tickets(state.ticket_list, query.get("conditions"))
+                page = int(query.get("page", 1))
+                page_size = min(int(query.get("pageSize", 25)), state.max_page_size)
+                return self.send_json([project(ticket, query.get("fields")) for ticket in tickets[(page - 1) * page_size:page * page_size]])
+            match = TICKET_PATH_PATTERN.fullmatch(path)
+            if not match or int(match.group(1)) not in state.tickets:
+                return self.send_json({"message": "not found"}, 404)
+            ticket_id = int(match.group(1))
+            if match.group(2):
+                if method == "POST":
+                    note = self.read_json()
+                    with state.lock:
+                        state.notes[ticket_id].append(note)
+                    return self.send_json(note, 201)
+                return self.send_json(state.notes[ticket_id])
+            if method == "PATCH":
+                with state.lock:
+                    for operation in self.read_json():
+                        state.tickets[ticket_id][operation["path"]] = operation["value"]
+            return self.send_json(project(state.tickets[ticket_id], query.get("fields")))
+        def handle_postgrest(self, method, table, query):
+            with state.lock:
+                rows = state.tables.setdefault(table, [])
+                if method == "POST":
+                    new_rows = self.read_json()
+                    new_rows = new_rows if isinstance(new_rows, list) else [new_rows]
+                    rows.extend(new_rows)
+                    return self.send_json(new_rows, 201)
+                result = rows
+                for column, values in query.items():
+                    if column in ("select", "order", "limit", "offset"):
+                        continue
+                    for value in values:
+                        operator, _, operand = value.partition(".")
+                        if operator == "eq":
+                            result = [row for row in result if str(row.get(column)) == operand]
+                        elif operator == "in":
+                            options = {option.strip('"') for option in operand.strip("()").split(",")}
+                            result = [row for row in result if str(row.get(column)) in options]
+                offset = int(query.get("offset", ["0"])[-1])
+                limit = query.get("limit")
+                result = result[offset:offset + int(limit[-1])] if limit else result[offset:]
+            return self.send_json(result)
+        def do_GET(self):
+            self.handle_request("GET")
+        def do_POST(self):
+            self.handle_request("POST")
+        def do_PATCH(self):
+            self.handle_request("PATCH")
+    return Handler
+def start_mock_services(ticket_count=100, notes_per_ticket=1, latency_seconds=0.0, max_page_size=1000):
+    state = MockState(ticket_count, notes_per_ticket, latency_seconds, max_page_size)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_port}"
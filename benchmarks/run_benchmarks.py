@@ -0,0 +1,425 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+from mock_services import CONNECTWISE_PREFIX, SITE_CODES, SITES, make_notes, make_ticket, project, start_mock_services
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent))
+
+from dxc_core import closeout, connectwise, dispatch, export, flatten, live_dispatches, notes, runtime, supabase_client, technicians
+
+DEFAULT_BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+DEFAULT_RESULTS_DIR = BENCHMARK_DIR / "results"
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_OFFLINE_SIZES = [10000, 100000]
+DEFAULT_NOTE_COUNTS = [2000]
+SCENARIOS = ["report", "notes_concurrency", "payload_projection", "roster", "dispatch", "close_out", "live_dispatches", "flatten_frame", "export_memory", "note_parsing"]
+OFFLINE_SCENARIOS = ["flatten_frame", "export_memory", "note_parsing"]
+EXPORT_PAGE_SIZE = 1000
+NOTE_FILLER_LINES = [
+    "Tech arrived on site and met the end user at the front desk.",
+    "Replaced the fuser assembly and ran a test print; output is clean.",
+    "End user reports intermittent paper jams in tray 2 since Monday.",
+    "Checked in with the site contact, badge issued for the day.",
+    "Firmware updated to the latest release and the device was power cycled.",
+    "Parts shipped to site, tracking number added to the work order.",
+    "Waiting on the customer to confirm the device location and access hours."]
+PROVIDER_NOTE_PREFIXES = ["Provider's closing notes:", "Provider&#039;s closing notes:", "provider&#39;s Closing Notes", "Provider closing notes:"]
+PROJECTIONS = [
+    ("full", None),
+    ("report", connectwise.REPORT_TICKET_FIELDS),
+    ("runbook", connectwise.RUNBOOK_TICKET_FIELDS),
+    ("input", connectwise.INPUT_TICKET_FIELDS)]
+
+def configure_core(base_url, workdir, requests_per_second):
+    os.chdir(workdir)
+    runtime.configure({
+        "connectwise": {
+            "connectwise_company_id": "benchmark",
+            "connectwise_public_key": "public",
+            "connectwise_private_key": "private",
+            "connectwise_client_id": "client",
+            "connectwise_url_base": f"{base_url}{CONNECTWISE_PREFIX}",
+            "ticket_store_path": os.path.join(workdir, "dxc_ticket_store.sqlite3"),
+            "ticket_snapshot_dir": os.path.join(workdir, "dxc_ticket_snapshots"),
+            "requests_per_second": float(requests_per_second)},
+        "supabase": {
+            "SUPABASE_URL": base_url,
+            "SUPABASE_KEY": "benchmark.anon.key"}})
+def connectwise_endpoint(method, path):
+    return f"{method} {CONNECTWISE_PREFIX}{path}"
+def unwrap(result, action):
+    if not result.ok:
+        raise RuntimeError(f"{action} failed: {'; '.join(result.errors)}")
+    return result.value
+def latency_summary(latencies):
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    return {
+        "p50": round(1000 * statistics.median(ordered), 2),
+        "p95": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 2),
+        "max": round(1000 * ordered[-1], 2)}
+def timed_calls(function, arguments):
+    latencies = []
+    for argument in arguments:
+        started = perf_counter()
+        function(argument)
+        latencies.append(perf_counter() - started)
+    return latencies
+def synthetic_report_tickets(ticket_ids):
+    fields = ",".join(connectwise.REPORT_TICKET_FIELDS)
+    return [project(make_ticket(ticket_id), fields) for ticket_id in ticket_ids], {ticket_id: make_notes(ticket_id, 1) for ticket_id in ticket_ids}
+def peak_rss_mb():
+    import resource
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+def proc_status_mb(field):
+    with open("/proc/self/status", encoding="ascii") as status_file:
+        for line in status_file:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise OSError(f"{field} is not reported in /proc/self/status")
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        return proc_status_mb("VmHWM") <= proc_status_mb("VmRSS")
+    except OSError:
+        return False
+def measure_export_peak_rss(size, constant_memory):
+    peak_was_reset = reset_peak_rss()
+    rss_before_mb = proc_status_mb("VmRSS") if peak_was_reset else peak_rss_mb()
+    exporter = export.TicketReportExporter(flatten.report_export_columns(), ["Excel"], constant_memory=constant_memory)
+    started = perf_counter()
+    try:
+        for first_id in range(1, size + 1, EXPORT_PAGE_SIZE):
+            tickets, notes_by_ticket = synthetic_report_tickets(range(first_id, min(first_id + EXPORT_PAGE_SIZE, size + 1)))
+            exporter.write_frame(flatten.build_ticket_report_frame(unwrap(flatten.flatten_ticket_frame(tickets, None, None, notes_by_ticket), "export")))
+        exporter.close()
+        file_mb = os.path.getsize(exporter.paths["Excel"]) / (1024 * 1024)
+    finally:
+        exporter.discard()
+    peak_mb = proc_status_mb("VmHWM") if peak_was_reset else peak_rss_mb()
+    return {"seconds": perf_counter() - started, "rss_before_mb": rss_before_mb, "peak_rss_mb": peak_mb, "peak_growth_mb": peak_mb - rss_before_mb, "file_mb": file_mb, "peak_source": "VmHWM" if peak_was_reset else "ru_maxrss"}
+def run_report(headers, base_url, size, options, state):
+    ticket_count = 0
+    for tickets in connectwise.iter_connectwise_ticket_pages(headers, base_url, board_id=1, parallel=True, fields=connectwise.REPORT_TICKET_FIELDS):
+        flatten.build_ticket_report_frame(unwrap(flatten.flatten_ticket_frame(tickets, headers, base_url), "report"))
+        ticket_count += len(tickets)
+    if ticket_count != size:
+        raise RuntimeError(f"report returned {ticket_count} tickets, expected {size}")
+    return size, [], {"expected_requests": {
+        connectwise_endpoint("GET", "/service/tickets/count"): 1,
+        connectwise_endpoint("GET", "/service/tickets"): -(-size // 1000) + 1,
+        connectwise_endpoint("GET", "/service/tickets/{id}/notes"): size}}
+def run_notes_concurrency(headers, base_url, size, options, state):
+    ticket_ids = list(range(1, min(size, options.notes_limit) + 1)) + [size + 1]
+    state.latency_seconds = max(state.latency_seconds, options.notes_latency_ms / 1000)
+    seconds = {}
+    failures = []
+    for mode, max_workers in [("sequential", 1), ("concurrent", None)]:
+        started = perf_counter()
+        notes_result = connectwise.get_connectwise_notes_for_tickets(headers, base_url, ticket_ids, max_workers=max_workers)
+        seconds[mode] = perf_counter() - started
+        lost_ids = [ticket_id for ticket_id in ticket_ids[:-1] if not notes_result.value.get(ticket_id)]
+        if list(notes_result.value) != ticket_ids or lost_ids or not notes_result.errors:
+            failures.append(f"{mode} notes fetch returned {len(notes_result.value)} tickets out of order or lost {len(lost_ids)}, or hid the missing ticket's error")
+    if seconds["concurrent"] >= seconds["sequential"]:
+        failures.append(f"concurrent notes fetch took {seconds['concurrent']:.3f}s, sequential {seconds['sequential']:.3f}s")
+    return len(ticket_ids), [], {
+        "sequential_seconds": round(seconds["sequential"], 4),
+        "concurrent_seconds": round(seconds["concurrent"], 4),
+        "speedup": round(seconds["sequential"] / seconds["concurrent"], 1) if seconds["concurrent"] else None,
+        "failures": failures,
+        "expected_requests": {connectwise_endpoint("GET", "/service/tickets/{id}/notes"): 2 * len(ticket_ids)}}
+def run_payload_projection(headers, base_url, size, options, state):
+    client = connectwise.get_connectwise_client()
+    conditions = connectwise.build_ticket_conditions(board_id=1)
+    page_count = -(-size // options.max_page_size)
+    details = {}
+    for projection, fields in PROJECTIONS:
+        bytes_count = 0
+        parse_seconds = 0.0
+        for page in range(1, page_count + 1):
+            params = {"conditions": conditions, "page": page, "pageSize": options.max_page_size}
+            if fields:
+                params["fields"] = ",".join(fields)
+            response = client.get(f"{base_url}/service/tickets", headers=headers, params=params)
+            response.raise_for_status()
+            started = perf_counter()
+            response.json()
+            parse_seconds += perf_counter() - started
+            bytes_count += len(response.content)
+        details[f"{projection}_kb"] = round(bytes_count / 1024, 1)
+        details[f"{projection}_parse_ms"] = round(1000 * parse_seconds, 2)
+    details["failures"] = [
+        f"{projection} projection transferred {details[f'{projection}_kb']} KB, the full payload {details['full_kb']} KB"
+        for projection, fields in PROJECTIONS if fields and details[f"{projection}_kb"] >= details["full_kb"]]
+    details["expected_requests"] = {connectwise_endpoint("GET", "/service/tickets"): len(PROJECTIONS) * page_count}
+    return size, [], details
+def row_by_row_report_frame(flattened_tickets):
+    df = pd.DataFrame(flattened_tickets)
+    for col in ['CW-Check-In (Custom Field)', 'CW-Check-Out (Custom Field)']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    if 'CW-Check-In (Custom Field)' in df.columns:
+        df['Check in Date'] = df['CW-Check-In (Custom Field)'].dt.date
+        df['Check in Time'] = df['CW-Check-In (Custom Field)'].dt.time
+    if 'CW-Check-Out (Custom Field)' in df.columns:
+        df['Check Out Date'] = df['CW-Check-Out (Custom Field)'].dt.date
+        df['Check Out Time'] = df['CW-Check-Out (Custom Field)'].dt.time
+    filtered_data = []
+    for _, row in df.iterrows():
+        new_row = {}
+        for old_key, new_key in flatten.REPORT_COLUMNS_TO_KEEP:
+            new_row[new_key] = row.get(old_key)
+        filtered_data.append(new_row)
+    return pd.DataFrame(filtered_data)
+def run_flatten_frame(headers, base_url, size, options, state):
+    tickets, notes_by_ticket = synthetic_report_tickets(range(1, size + 1))
+    started = perf_counter()
+    flattened_tickets = unwrap(flatten.flatten_ticket_data(tickets, headers, base_url, notes_by_ticket), "flatten_ticket_data")
+    row_report = row_by_row_report_frame(flattened_tickets)
+    row_seconds = perf_counter() - started
+    started = perf_counter()
+    column_frame = unwrap(flatten.flatten_ticket_frame(tickets, headers, base_url, notes_by_ticket), "flatten_ticket_frame")
+    column_report = flatten.build_ticket_report_frame(column_frame)
+    column_seconds = perf_counter() - started
+    failures = []
+    for name, expected, actual, check_dtype in [
+            ("flattened", pd.DataFrame(flattened_tickets), column_frame, True),
+            ("report", row_report, column_report, False)]:
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=check_dtype)
+        except AssertionError as e:
+            failures.append(f"{name} frame differs from the row-by-row path: {e}")
+    return size, [], {
+        "row_by_row_seconds": round(row_seconds, 4),
+        "columnar_seconds": round(column_seconds, 4),
+        "speedup": round(row_seconds / column_seconds, 1) if column_seconds else None,
+        "failures": failures}
+def run_export_memory(headers, base_url, size, options, state):
+    details = {}
+    for mode, constant_memory in [("constant_memory", True), ("in_memory", False)]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            measurement = executor.submit(measure_export_peak_rss, size, constant_memory).result()
+        details[f"{mode}_seconds"] = round(measurement["seconds"], 3)
+        details[f"{mode}_peak_rss_mb"] = round(measurement["peak_rss_mb"], 1)
+        details[f"{mode}_rss_before_mb"] = round(measurement["rss_before_mb"], 1)
+        details[f"{mode}_peak_growth_mb"] = round(measurement["peak_growth_mb"], 1)
+    details["file_mb"] = round(measurement["file_mb"], 1)
+    details["peak_source"] = measurement["peak_source"]
+    if details["constant_memory_peak_growth_mb"] >= details["in_memory_peak_growth_mb"]:
+        details["failures"] = [f"constant_memory export grew peak RSS by {details['constant_memory_peak_growth_mb']} MB, the in-memory workbook by {details['in_memory_peak_growth_mb']} MB"]
+    return size, [], details
+def synthetic_notes(count):
+    generator = random.Random(count)
+    note_texts = []
+    for index in range(count):
+        lines = [generator.choice(NOTE_FILLER_LINES) for _ in range(generator.randint(5, 50))]
+        if generator.random() < 0.9:
+            lines.insert(generator.randint(0, len(lines)), f"HP Now Ticket # INC{index:07d}")
+        if generator.random() < 0.3:
+            lines.insert(generator.randint(0, len(lines)), f"Sites Continued: {generator.choice(SITES)}")
+        if generator.random() < 0.8:
+            lines.insert(generator.randint(len(lines) // 2, len(lines)), f"{generator.choice(PROVIDER_NOTE_PREFIXES)} replaced part {index}")
+        note_texts.append("\n".join(lines))
+    return note_texts
+def regex_per_field_note_fields(note_text):
+    hp_now_match = re.compile(r"HP Now Ticket #\s*([^\s\n]+)", re.IGNORECASE).search(note_text)
+    sites_continued_match = re.compile(r"Sites Continued:?\s*(.*)", re.IGNORECASE).search(note_text)
+    provider_notes_match = re.compile(r".*Provider(?:'s|&#039;s|&#39;s)?\s+closing\s+notes:?\s*(.*)", re.IGNORECASE | re.DOTALL).search(note_text)
+    return {
+        'hp_now_ticket': hp_now_match.group(1).strip() if hp_now_match else None,
+        'sites_continued': sites_continued_match.group(1).strip() if sites_continued_match else None,
+        'actions_taken': provider_notes_match.group(1).strip() if provider_notes_match else None}
+def run_note_parsing(headers, base_url, size, options, state):
+    note_texts = synthetic_notes(size)
+    seconds = {}
+    parsed = {}
+    for mode, parse in [("regex_per_field", regex_per_field_note_fields), ("single_pass", notes.parse_note_fields)]:
+        started = perf_counter()
+        parsed[mode] = [parse(note_text) for note_text in note_texts]
+        seconds[mode] = perf_counter() - started
+    mismatches = sum(old != new for old, new in zip(parsed["regex_per_field"], parsed["single_pass"]))
+    return size, [], {
+        "note_kb": round(sum(map(len, note_texts)) / 1024, 1),
+        "regex_per_field_seconds": round(seconds["regex_per_field"], 4),
+        "single_pass_seconds": round(seconds["single_pass"], 4),
+        "speedup": round(seconds["regex_per_field"] / seconds["single_pass"], 1) if seconds["single_pass"] else None,
+        "failures": [f"single-pass parser disagrees with the per-field regexes on {mismatches} notes"] if mismatches else []}
+def run_roster(headers, base_url, size, options, state):
+    lookups = min(size, options.roster_lookups)
+    site_codes = [SITE_CODES[index % len(SITE_CODES)] for index in range(lookups)]
+    supabase = unwrap(supabase_client.create_supabase_client(), "roster")
+    latencies = timed_calls(lambda site_code: unwrap(technicians.get_technicians_by_site(supabase, site_code), "roster"), site_codes)
+    return lookups, latencies, {"expected_requests": {"GET /rest/v1/names_and_sites": lookups, "GET /rest/v1/TECH INFORMATION": lookups}}
+def run_dispatch(headers, base_url, size, options, state):
+    dispatches = min(size, options.dispatch_limit)
+    technician = {"FIRST_NAME": "Tech1", "LAST_NAME": "Person1", "FIELD_NATION_ID": 1001, "SURYL_EMAIL": "tech1@example.com"}
+    def dispatch_one(ticket_id):
+        ticket_data = unwrap(connectwise.get_connectwise_single_ticket(headers, base_url, ticket_id, fields=connectwise.RUNBOOK_TICKET_FIELDS), f"fetch of ticket {ticket_id}")
+        outcome = dispatch.dispatch_ticket(headers, base_url, ticket_id, ticket_data, technician, "9/13, 1PM")
+        if not outcome["ok"]:
+            raise RuntimeError(f"dispatch of ticket {ticket_id} failed: {outcome['errors']}")
+    latencies = timed_calls(dispatch_one, range(1, dispatches + 1))
+    return dispatches, latencies, {"expected_requests": {
+        connectwise_endpoint("GET", "/service/boards/{id}/statuses"): 1,
+        connectwise_endpoint("GET", "/service/tickets/{id}"): dispatches,
+        connectwise_endpoint("POST", "/service/tickets/{id}/notes"): dispatches,
+        connectwise_endpoint("PATCH", "/service/tickets/{id}"): dispatches}}
+def run_close_out(headers, base_url, size, options, state):
+    ticket_ids = [str(ticket_id) for ticket_id in range(1, min(size, options.dispatch_limit) + 1)]
+    def fetch_details(ticket_id):
+        ticket_data = unwrap(connectwise.get_connectwise_single_ticket(headers, base_url, ticket_id, fields=connectwise.INPUT_TICKET_FIELDS), f"fetch of ticket {ticket_id}")
+        ticket_notes = unwrap(connectwise.get_connectwise_ticket_notes(headers, base_url, ticket_id), f"notes fetch of ticket {ticket_id}")
+        closeout.build_close_out_row(ticket_data, ticket_notes, headers, base_url)
+    latencies = timed_calls(fetch_details, ticket_ids)
+    close_out_rows, missing_ids = unwrap(closeout.fetch_close_out_rows(headers, base_url, ticket_ids), "bulk close-out")
+    if missing_ids or len(close_out_rows) != len(ticket_ids):
+        raise RuntimeError(f"bulk close-out found {len(close_out_rows)} of {len(ticket_ids)} tickets")
+    return len(ticket_ids), latencies, {"expected_requests": {
+        connectwise_endpoint("GET", "/service/tickets/{id}"): 2 * len(ticket_ids),
+        connectwise_endpoint("GET", "/service/tickets/{id}/notes"): 2 * len(ticket_ids)}}
+def run_live_dispatches(headers, base_url, size, options, state):
+    supabase = unwrap(supabase_client.create_supabase_client(), "live_dispatches")
+    writer = live_dispatches.LiveDispatchWriter(
+        lambda: supabase,
+        os.path.join(os.getcwd(), f"live_dispatch_queue_{size}.jsonl"),
+        live_dispatches.LIVE_DISPATCH_BATCH_SIZE,
+        live_dispatches.LIVE_DISPATCH_RETRY_SECONDS,
+        os.path.join(os.getcwd(), f"live_dispatch_rejected_{size}.jsonl"))
+    rows = [{"SURYLID": str(ticket_id), "Site": "Alpha - AQN", "Priority": "Priority 1 - Critical", "Hours": 2.0, "Multiplier": 1.0} for ticket_id in range(1, size + 1)]
+    outcome = writer.submit(rows)
+    if outcome["queued"]:
+        raise RuntimeError(f"{len(outcome['queued'])} live_dispatches rows were queued instead of inserted")
+    batches = -(-size // live_dispatches.LIVE_DISPATCH_BATCH_SIZE)
+    return size, [], {"expected_requests": {"GET /rest/v1/live_dispatches": batches, "POST /rest/v1/live_dispatches": batches}}
+SCENARIO_RUNNERS = {
+    "report": run_report,
+    "notes_concurrency": run_notes_concurrency,
+    "payload_projection": run_payload_projection,
+    "roster": run_roster,
+    "dispatch": run_dispatch,
+    "close_out": run_close_out,
+    "live_dispatches": run_live_dispatches,
+    "flatten_frame": run_flatten_frame,
+    "export_memory": run_export_memory,
+    "note_parsing": run_note_parsing}
+
+def request_budget_failures(requests_by_endpoint, expected_requests):
+    if expected_requests is None:
+        return []
+    return [
+        f"made {count} {endpoint} requests, expected at most {expected_requests.get(endpoint, 0)}"
+        for endpoint, count in sorted(requests_by_endpoint.items()) if count > expected_requests.get(endpoint, 0)]
+def run_benchmarks(options):
+    server, state, base_url = start_mock_services(latency_seconds=options.latency_ms / 1000, max_page_size=options.max_page_size)
+    workdir = tempfile.mkdtemp(prefix="dxc_benchmark_")
+    configure_core(base_url, workdir, options.requests_per_second)
+    headers, connectwise_url = unwrap(connectwise.get_connectwise_auth_headers(), "ConnectWise authentication")
+    results = []
+    runs = [(size, scenario) for size in options.sizes for scenario in options.scenarios if scenario not in OFFLINE_SCENARIOS]
+    runs += [(size, scenario) for scenario in options.scenarios if scenario in OFFLINE_SCENARIOS for size in (options.note_counts if scenario == "note_parsing" else options.offline_sizes)]
+    try:
+        for size, scenario in runs:
+            if scenario not in OFFLINE_SCENARIOS:
+                state.reset(size, options.notes_per_ticket, options.latency_ms / 1000, options.max_page_size)
+            connectwise.get_connectwise_client().latency.clear()
+            started = perf_counter()
+            items, latencies, details = SCENARIO_RUNNERS[scenario](headers, connectwise_url, size, options, state)
+            seconds = perf_counter() - started
+            requests_by_endpoint = state.take_calls()
+            failures = details.pop("failures", []) + request_budget_failures(requests_by_endpoint, details.pop("expected_requests", None))
+            result = {
+                "scenario": scenario,
+                "size": size,
+                "items": items,
+                "seconds": round(seconds, 4),
+                "throughput_per_second": round(items / seconds, 1) if seconds else None,
+                "latency_ms": latency_summary(latencies),
+                "requests": sum(requests_by_endpoint.values()),
+                "requests_by_endpoint": requests_by_endpoint,
+                "failures": failures,
+                **details}
+            results.append(result)
+            print(f"{scenario:>18} {size:>6}  {result['seconds']:>9.3f}s  {result['throughput_per_second'] or 0:>10.1f}/s  {result['requests']:>6} requests", flush=True)
+    finally:
+        server.shutdown()
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "options": {"latency_ms": options.latency_ms, "requests_per_second": options.requests_per_second, "notes_per_ticket": options.notes_per_ticket, "max_page_size": options.max_page_size, "dispatch_limit": options.dispatch_limit, "roster_lookups": options.roster_lookups, "notes_limit": options.notes_limit, "notes_latency_ms": options.notes_latency_ms, "offline_sizes": options.offline_sizes, "note_counts": options.note_counts},
+        "results": results}
+def compare_to_baseline(run, baseline, tolerance):
+    baseline_results = {(result["scenario"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in run["results"]:
+        previous = baseline_results.get((result["scenario"], result["size"]))
+        if not previous:
+            continue
+        if result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(f"{result['scenario']} @ {result['size']}: {previous['seconds']:.3f}s -> {result['seconds']:.3f}s")
+        if result["requests"] > previous["requests"]:
+            regressions.append(f"{result['scenario']} @ {result['size']}: {previous['requests']} -> {result['requests']} requests")
+    return regressions
+def check_failures(run):
+    return [f"{result['scenario']} @ {result['size']}: {failure}" for result in run["results"] for failure in result.get("failures", [])]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DXC Runbook helpers against local ConnectWise and Supabase stand-ins.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--offline-sizes", type=int, nargs="+", default=DEFAULT_OFFLINE_SIZES, help="Ticket counts for the scenarios that do not call the mocks.")
+    parser.add_argument("--note-counts", type=int, nargs="+", default=DEFAULT_NOTE_COUNTS, help="Note counts for note_parsing.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every mock request.")
+    parser.add_argument("--requests-per-second", type=float, default=1000.0, help="ConnectWise rate limit the app is configured with (the production default is 10).")
+    parser.add_argument("--notes-per-ticket", type=int, default=1)
+    parser.add_argument("--max-page-size", type=int, default=1000)
+    parser.add_argument("--dispatch-limit", type=int, default=200, help="Maximum tickets dispatched per size.")
+    parser.add_argument("--roster-lookups", type=int, default=200, help="Maximum roster lookups per size.")
+    parser.add_argument("--notes-limit", type=int, default=200, help="Maximum tickets whose notes are fetched per size in notes_concurrency.")
+    parser.add_argument("--notes-latency-ms", type=float, default=10.0, help="Minimum mock latency for notes_concurrency, so sequential and concurrent fetches differ.")
+    parser.add_argument("--output", type=Path, help="Where to write this run's results (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline before failing.")
+    return parser.parse_args(argv)
+def main(argv=None):
+    options = parse_args(argv)
+    run = run_benchmarks(options)
+    output_path = options.output or DEFAULT_RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(run, indent=2))
+    print(f"Results written to {output_path}")
+    failures = check_failures(run)
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if options.save_baseline:
+        options.baseline.write_text(json.dumps(run, indent=2))
+        print(f"Baseline saved to {options.baseline}")
+        return 1 if failures else 0
+    if not options.baseline.exists():
+        print("No baseline found; run with --save-baseline to record one.")
+        return 1 if failures else 0
+    regressions = compare_to_baseline(run, json.loads(options.baseline.read_text()), options.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions or failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pandas as pd
+
+from dxc_core.connectwise import INPUT_TICKET_FIELDS, get_connectwise_notes_for_tickets, get_connectwise_rate_limiter, get_connectwise_single_ticket
+from dxc_core.flatten import flatten_single_ticket, parse_cw_timestamp
+from dxc_core.instrumentation import instrumented
+from dxc_core.notes import extract_actions_taken, find_field_nation_internal_note
+from dxc_core.results import Result
+from dxc_core.rules import calculate_multiplier, parse_check_time
+from dxc_core.runtime import get_setting, thread_pool
+
+CLOSE_OUT_MAX_WORKERS = 8
+CLOSE_OUT_COLUMNS = ['SURYLID', 'HPID', 'Site', 'Priority', 'SLA', 'Tech', 'Date', 'Hours', 'Multiplier', 'CheckInDate', 'CheckInTime', 'CheckOutDate', 'CheckOutTime', 'Type', 'Subtype', 'Item', 'Actions Taken']
+
+@instrumented("build_close_out_row")
+def build_close_out_row(ticket_data, ticket_notes, headers, base_url):
+    flattened_ticket = flatten_single_ticket(ticket_data, headers, base_url, ticket_notes or []).value
+    hours_from_cw = 0.0
+    total_hours_str = flattened_ticket.get('CW-Total Hours (Custom Field)')
+    if total_hours_str:
+        try:
+            hours_from_cw = float(total_hours_str)
+        except ValueError:
+            hours_from_cw = 0.0
+    check_in_date_obj, check_in_time_str = parse_cw_timestamp(flattened_ticket.get('CW-Check-In (Custom Field)'))
+    check_out_date_obj, check_out_time_str = parse_cw_timestamp(flattened_ticket.get('CW-Check-Out (Custom Field)'))
+    check_in_time_obj = parse_check_time(check_in_time_str)
+    multiplier_calculated = 1.0
+    if check_in_date_obj and check_in_time_obj:
+        multiplier_calculated = calculate_multiplier(check_in_date_obj, check_in_time_obj)
+    return {
+        'SURYLID': str(ticket_data['id']),
+        'HPID': flattened_ticket.get('HP Now Ticket #') or 'N/A',
+        'Site': ticket_data.get('site', {}).get('name', 'N/A'),
+        'Priority': ticket_data.get('priority', {}).get('name', 'N/A'),
+        'SLA': flattened_ticket.get('SLA', 'N/A'),
+        'Tech': (flattened_ticket.get('CW-Technician Name (Custom Field)') or '').strip(),
+        'Date': date.today(),
+        'Hours': hours_from_cw,
+        'Multiplier': multiplier_calculated,
+        'CheckInDate': check_in_date_obj if check_in_date_obj else date.today(),
+        'CheckInTime': check_in_time_str if check_in_time_str else "09:00 AM",
+        'CheckOutDate': check_out_date_obj,
+        'CheckOutTime': check_out_time_str,
+        'Type': flattened_ticket.get('Type', 'N/A'),
+        'Subtype': flattened_ticket.get('Subtype', 'N/A'),
+        'Item': flattened_ticket.get('Item', 'N/A'),
+        'Actions Taken': extract_actions_taken(find_field_nation_internal_note(ticket_notes))}
+def build_resolution_note(check_in_date, start_time, end_time, hours, actions_taken):
+    return (
+        f"Date of Visit: {check_in_date.strftime('%Y-%m-%d')}\n"
+        f"Start Time: {start_time}\n"
+        f"End Time: {end_time}\n"
+        f"Time in Hours: {hours}\n"
+        f"End User Notified: Yes\n\n"
+        f"Actions Taken:\n"
+        f"{actions_taken}")
+def fetch_close_out_rows(headers, base_url, ticket_ids, max_workers=None):
+    if max_workers is None:
+        max_workers = get_setting("close_out_max_workers", CLOSE_OUT_MAX_WORKERS)
+    limiter = get_connectwise_rate_limiter(base_url)
+    def fetch_ticket(ticket_id):
+        limiter.wait()
+        return get_connectwise_single_ticket(headers, base_url, ticket_id, fields=INPUT_TICKET_FIELDS)
+    with thread_pool(max_workers) as executor:
+        ticket_results = dict(zip(ticket_ids, executor.map(fetch_ticket, ticket_ids)))
+    errors = [error for ticket_result in ticket_results.values() for error in ticket_result.errors]
+    found_ids = [ticket_id for ticket_id, ticket_result in ticket_results.items() if ticket_result.value]
+    notes_result = get_connectwise_notes_for_tickets(headers, base_url, found_ids, max_workers=max_workers)
+    close_out_rows = [
+        build_close_out_row(ticket_results[ticket_id].value, notes_result.value.get(ticket_id) or [], headers, base_url)
+        for ticket_id in found_ids]
+    missing_ids = [ticket_id for ticket_id in ticket_ids if ticket_id not in found_ids]
+    return Result((close_out_rows, missing_ids), errors + notes_result.errors)
+def to_iso_date(value):
+    if value is None or pd.isna(value):
+        return None
+    return pd.Timestamp(value).date().isoformat()
@@ -0,0 +1,355 @@
+import base64
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+import requests
+
+from dxc_core.instrumentation import record_operation
+from dxc_core.results import ConnectWiseError, Result
+from dxc_core.runtime import get_section, get_setting, process_resource, thread_pool
+
+DEFAULT_CONNECTWISE_URL_BASE = "https://api-na.myconnectwise.net/v4_6_release/apis/3.0"
+NOTES_MAX_WORKERS = 8
+PAGE_MAX_WORKERS = 4
+CONNECTWISE_REQUESTS_PER_SECOND = 10.0
+CONNECTWISE_TIMEOUT = (5, 60)
+CONNECTWISE_MAX_RETRIES = 4
+CONNECTWISE_BACKOFF_SECONDS = 0.5
+CONNECTWISE_MAX_BACKOFF_SECONDS = 30.0
+CONNECTWISE_POOL_SIZE = 20
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PATCH", "PUT", "DELETE"}
+ENDPOINT_ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+REFERENCE_CACHE_TTL_SECONDS = 3600
+REFERENCE_CACHE_MAX_ENTRIES = 512
+REFERENCE_CACHE_EMPTY_TTL_SECONDS = 60
+REPORT_TICKET_FIELDS = ["id", "summary", "board", "status", "type", "subType", "item", "priority", "site", "siteName", "customFields", "dateEntered", "_info/lastUpdated"]
+RUNBOOK_TICKET_FIELDS = ["id", "summary", "board", "company", "site", "priority", "customFields"]
+INPUT_TICKET_FIELDS = ["id", "summary", "site", "priority", "type", "subType", "item", "customFields"]
+
+class RateLimiter:
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second and requests_per_second > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = monotonic()
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            sleep(slot - now)
+
+class ConnectWiseClient:
+    def __init__(self, pool_size=CONNECTWISE_POOL_SIZE, timeout=CONNECTWISE_TIMEOUT, max_retries=CONNECTWISE_MAX_RETRIES, backoff_seconds=CONNECTWISE_BACKOFF_SECONDS):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.lock = threading.Lock()
+        self.latency = {}
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = f"{method} {ENDPOINT_ID_PATTERN.sub('/{id}', urlparse(url).path)}"
+        attempt = 0
+        while True:
+            started = monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.record_latency(endpoint, monotonic() - started, None, 0)
+                if method not in IDEMPOTENT_METHODS or attempt >= self.max_retries:
+                    raise
+                sleep(self.backoff_delay(attempt, None))
+                attempt += 1
+                continue
+            self.record_latency(endpoint, monotonic() - started, response.status_code, len(response.content))
+            retryable = response.status_code == 429 or (response.status_code in RETRY_STATUS_CODES and method in IDEMPOTENT_METHODS)
+            if not retryable or attempt >= self.max_retries:
+                return response
+            sleep(self.backoff_delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+    def backoff_delay(self, attempt, retry_after):
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), CONNECTWISE_MAX_BACKOFF_SECONDS)
+        return min(self.backoff_seconds * (2 ** attempt), CONNECTWISE_MAX_BACKOFF_SECONDS)
+    def record_latency(self, endpoint, seconds, status_code, bytes_count):
+        record_operation("connectwise", endpoint, seconds, bytes_count, status_code is None or status_code >= 400)
+        with self.lock:
+            stats = self.latency.setdefault(endpoint, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["calls"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            if status_code is None or status_code >= 400:
+                stats["errors"] += 1
+    def latency_stats(self):
+        with self.lock:
+            return [
+                {"Endpoint": endpoint, "Calls": stats["calls"], "Errors": stats["errors"],
+                 "Avg ms": round(1000 * stats["total_seconds"] / stats["calls"], 1), "Max ms": round(1000 * stats["max_seconds"], 1)}
+                for endpoint, stats in sorted(self.latency.items())]
+
+class TTLCache:
+    def __init__(self, ttl_seconds, max_entries, empty_ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.empty_ttl_seconds = empty_ttl_seconds
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def get_or_load(self, key, loader):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.entries.pop(key, None)
+            self.misses += 1
+        value = loader()
+        ttl_seconds = self.ttl_seconds if value else self.empty_ttl_seconds
+        if value is not None and ttl_seconds > 0:
+            with self.lock:
+                self.entries[key] = (monotonic() + ttl_seconds, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+    def stats(self):
+        with self.lock:
+            return {"Hits": self.hits, "Misses": self.misses, "Entries": len(self.entries)}
+
+@process_resource
+def get_host_rate_limiter(host, requests_per_second):
+    return RateLimiter(requests_per_second)
+def get_connectwise_rate_limiter(base_url, requests_per_second=None):
+    if requests_per_second is None:
+        requests_per_second = get_setting("requests_per_second", CONNECTWISE_REQUESTS_PER_SECOND)
+    return get_host_rate_limiter(urlparse(base_url).netloc, requests_per_second)
+@process_resource
+def get_connectwise_client():
+    return ConnectWiseClient()
+@process_resource
+def get_reference_cache():
+    return TTLCache(
+        get_setting("reference_cache_ttl_seconds", REFERENCE_CACHE_TTL_SECONDS),
+        get_setting("reference_cache_max_entries", REFERENCE_CACHE_MAX_ENTRIES),
+        get_setting("reference_cache_empty_ttl_seconds", REFERENCE_CACHE_EMPTY_TTL_SECONDS))
+@process_resource
+def build_connectwise_auth_headers(company_id, public_key, private_key, client_id):
+    auth_string = f"{company_id}+{public_key}:{private_key}"
+    encoded_auth_string = base64.b64encode(auth_string.encode("ascii")).decode("ascii")
+    return {
+        "Authorization": f"Basic {encoded_auth_string}",
+        "clientId": client_id,
+        "Accept": "application/vnd.connectwise.com+json",
+        "Content-Type": "application/json"}
+def get_connectwise_auth_headers():
+    connectwise_settings = get_section("connectwise")
+    try:
+        headers = build_connectwise_auth_headers(
+            connectwise_settings["connectwise_company_id"],
+            connectwise_settings["connectwise_public_key"],
+            connectwise_settings["connectwise_private_key"],
+            connectwise_settings["connectwise_client_id"])
+    except KeyError as e:
+        return Result.failure(f"Missing ConnectWise credential in `secrets.toml`: {e}", value=(None, None))
+    return Result((headers, connectwise_settings.get("connectwise_url_base", DEFAULT_CONNECTWISE_URL_BASE)))
+def request_json(method, url, headers, action, fallback_action, **kwargs):
+    try:
+        response = get_connectwise_client().request(method, url, headers=headers, **kwargs)
+        response.raise_for_status()
+        return Result(response.json())
+    except requests.exceptions.HTTPError as e:
+        return Result.failure(f"HTTP Error {action}: {e}", f"Response content: {e.response.text}")
+    except requests.exceptions.RequestException as e:
+        return Result.failure(f"Error {fallback_action}: {e}")
+def cached_request_json(cache_key, url, headers, action, fallback_action, **kwargs):
+    errors = []
+    def load():
+        result = request_json("GET", url, headers, action, fallback_action, **kwargs)
+        errors.extend(result.errors)
+        return result.value
+    return Result(get_reference_cache().get_or_load(cache_key, load), errors)
+def get_connectwise_boards(headers, base_url):
+    if not headers or not base_url:
+        return Result()
+    return cached_request_json(("boards", base_url), f"{base_url}/service/boards", headers, "fetching boards", "fetching ConnectWise boards")
+def build_ticket_conditions(board_id=None, start_date=None, end_date=None, updated_since=None):
+    conditions = []
+    if board_id:
+        conditions.append(f'board/id = {board_id}')
+    if start_date and end_date:
+        start_date_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
+        end_date_str = end_date.strftime("%Y-%m-%dT23:59:59Z")
+        conditions.append(f'dateEntered >= "{start_date_str}" and dateEntered <= "{end_date_str}"')
+    elif start_date:
+        start_date_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
+        conditions.append(f'dateEntered >= "{start_date_str}"')
+    elif end_date:
+        end_date_str = end_date.strftime("%Y-%m-%dT23:59:59Z")
+        conditions.append(f'dateEntered <= "{end_date_str}"')
+    if updated_since:
+        conditions.append(f'lastUpdated >= "{updated_since}"')
+    return " and ".join(conditions)
+def get_connectwise_ticket_count(headers, base_url, conditions):
+    params = {"conditions": conditions} if conditions else {}
+    result = request_json("GET", f"{base_url}/service/tickets/count", headers, "fetching ticket count", "fetching ConnectWise ticket count", params=params)
+    if result.ok:
+        result.value = result.value.get("count", 0)
+    return result
+def get_connectwise_ticket_page(headers, base_url, conditions, page, page_size, fields=None):
+    params = {
+        "pageSize": page_size,
+        "page": page}
+    if conditions:
+        params["conditions"] = conditions
+    if fields:
+        params["fields"] = ",".join(fields)
+    return request_json("GET", f"{base_url}/service/tickets", headers, "fetching tickets", "fetching ConnectWise tickets", params=params)
+def fetch_ticket_page(headers, base_url, conditions, page, page_size, fields=None):
+    result = get_connectwise_ticket_page(headers, base_url, conditions, page, page_size, fields)
+    if not result.ok:
+        raise ConnectWiseError(result.errors)
+    return result.value
+def iter_connectwise_ticket_pages(headers, base_url, board_id=None, status_id=None, start_date=None, end_date=None, updated_since=None, page_size=1000, parallel=False, max_workers=None, fields=None):
+    conditions = build_ticket_conditions(board_id, start_date, end_date, updated_since)
+    page = 1
+    if parallel:
+        if max_workers is None:
+            max_workers = get_setting("page_max_workers", PAGE_MAX_WORKERS)
+        limiter = get_connectwise_rate_limiter(base_url)
+        def fetch_page(page_number):
+            limiter.wait()
+            return fetch_ticket_page(headers, base_url, conditions, page_number, page_size, fields)
+        count_result = get_connectwise_ticket_count(headers, base_url, conditions)
+        if not count_result.ok:
+            raise ConnectWiseError(count_result.errors)
+        page_count = -(-count_result.value // page_size)
+        tickets = []
+        with thread_pool(max_workers) as executor:
+            pending = deque()
+            while page <= page_count or pending:
+                while page <= page_count and len(pending) < max(1, max_workers):
+                    pending.append(executor.submit(fetch_page, page))
+                    page += 1
+                tickets = pending.popleft().result()
+                if tickets:
+                    yield tickets
+        if not page_count or len(tickets) < page_size:
+            return
+    while True:
+        tickets = fetch_ticket_page(headers, base_url, conditions, page, page_size, fields)
+        if not tickets:
+            return
+        yield tickets
+        if len(tickets) < page_size:
+            return
+        page += 1
+def get_connectwise_tickets(headers, base_url, board_id=None, status_id=None, start_date=None, end_date=None, updated_since=None, parallel=False, fields=None):
+    if not headers or not base_url:
+        return Result()
+    all_tickets = []
+    try:
+        for tickets in iter_connectwise_ticket_pages(headers, base_url, board_id, status_id, start_date, end_date, updated_since, parallel=parallel, fields=fields):
+            all_tickets.extend(tickets)
+    except ConnectWiseError as e:
+        return Result.failure(*e.errors)
+    return Result(all_tickets)
+def get_connectwise_single_ticket(headers, base_url, ticket_id, fields=None):
+    if not headers or not base_url or not ticket_id:
+        return Result()
+    params = {"fields": ",".join(fields)} if fields else None
+    return request_json("GET", f"{base_url}/service/tickets/{ticket_id}", headers, f"fetching ticket {ticket_id}", f"fetching ConnectWise ticket {ticket_id}", params=params)
+def get_connectwise_ticket_notes(headers, base_url, ticket_id):
+    if not headers or not base_url or not ticket_id:
+        return Result()
+    return request_json("GET", f"{base_url}/service/tickets/{ticket_id}/notes", headers, f"fetching notes for ticket {ticket_id}", "fetching ConnectWise ticket notes")
+def get_connectwise_notes_for_tickets(headers, base_url, ticket_ids, max_workers=None, requests_per_second=None):
+    if not headers or not base_url or not ticket_ids:
+        return Result({})
+    if max_workers is None:
+        max_workers = get_setting("notes_max_workers", NOTES_MAX_WORKERS)
+    limiter = get_connectwise_rate_limiter(base_url, requests_per_second)
+    def fetch_notes(ticket_id):
+        limiter.wait()
+        try:
+            return get_connectwise_ticket_notes(headers, base_url, ticket_id)
+        except Exception as e:
+            return Result.failure(f"Error fetching notes for ticket {ticket_id}: {e}")
+    with thread_pool(max_workers) as executor:
+        results = list(executor.map(fetch_notes, ticket_ids))
+    return Result({ticket_id: result.value for ticket_id, result in zip(ticket_ids, results)}, [error for result in results for error in result.errors])
+def add_connectwise_ticket_note(headers, base_url, ticket_id, note_text, resolution=False):
+    note_kind = "resolution note" if resolution else "ticket note"
+    if not headers or not base_url or not ticket_id or not note_text:
+        return Result.failure(f"Missing parameters for adding a {'resolution' if resolution else 'ticket'} note.")
+    note_payload = {
+        "text": note_text,
+        "detailDescriptionFlag": not resolution,
+        "internalAnalysisFlag": False,
+        "resolutionFlag": resolution}
+    return request_json(
+        "POST", f"{base_url}/service/tickets/{ticket_id}/notes", headers,
+        f"adding {'resolution ' if resolution else ''}note to ticket {ticket_id}", f"adding ConnectWise {note_kind}", json=note_payload)
+def add_connectwise_resolution_note(headers, base_url, ticket_id, note_text):
+    return add_connectwise_ticket_note(headers, base_url, ticket_id, note_text, resolution=True)
+def get_company_by_name(headers, base_url, company_name):
+    if not headers or not base_url or not company_name:
+        return Result()
+    result = cached_request_json(
+        ("company", base_url, company_name), f"{base_url}/company/companies", headers,
+        f"fetching company '{company_name}'", "fetching ConnectWise company details", params={"conditions": f'name = "{company_name}"'})
+    result.value = result.value[0] if result.value else None
+    return result
+def get_site_by_name(headers, base_url, company_id, site_name):
+    if not headers or not base_url or not site_name or not company_id:
+        return Result()
+    result = cached_request_json(
+        ("sites", base_url, company_id, site_name), f"{base_url}/company/companies/{company_id}/sites", headers,
+        f"fetching site '{site_name}'", "fetching ConnectWise site details", params={"conditions": f'name like "{site_name}"'})
+    result.value = next((site for site in result.value or [] if site.get('name', '').lower().find(site_name.lower()) != -1), None)
+    return result
+def update_connectwise_ticket(headers, base_url, ticket_id, update_payload):
+    if not headers or not base_url or not ticket_id or not update_payload:
+        return Result.failure("Missing parameters for ticket update.")
+    return request_json("PATCH", f"{base_url}/service/tickets/{ticket_id}", headers, f"updating ticket {ticket_id}", f"updating ConnectWise ticket {ticket_id}", json=update_payload)
+def get_status_by_name(headers, base_url, board_id, status_name):
+    result = cached_request_json(
+        ("board_statuses", base_url, board_id), f"{base_url}/service/boards/{board_id}/statuses", headers,
+        f"fetching statuses for board {board_id}", f"fetching statuses for board {board_id}")
+    result.value = next((status for status in result.value or [] if status.get('name', '').lower() == status_name.lower()), None)
+    return result
+def update_connectwise_ticket_status(headers, base_url, ticket_id, status_object):
+    result = update_connectwise_ticket(headers, base_url, ticket_id, [{"op": "replace", "path": "status", "value": status_object}])
+    result.value = result.ok
+    return result
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from dxc_core.connectwise import RUNBOOK_TICKET_FIELDS, add_connectwise_ticket_note, get_connectwise_rate_limiter, get_connectwise_single_ticket, get_status_by_name, update_connectwise_ticket
+from dxc_core.instrumentation import instrumented
+from dxc_core.notes import SUMMARY_DATE_PATTERN, first_note_text, parse_note_fields
+from dxc_core.results import Result
+from dxc_core.rules import site_code_from_name
+from dxc_core.runtime import thread_pool
+
+ETA_FORMAT_ERROR = "Invalid ETA format. Please use 'MM/DD, HPM' (e.g., '9/13, 1PM') or 'MM/DD, H:MM PM' (e.g., '8/12, 12:30PM')."
+ETA_FORMATS = ["%m/%d, %I:%M%p", "%m/%d, %I%p"]
+BULK_DISPATCH_COLUMNS = ['ticket_id', 'tech', 'eta']
+
+def parse_eta(eta_string):
+    for eta_format in ETA_FORMATS:
+        try:
+            parsed_datetime = datetime.strptime(eta_string.strip(), eta_format)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    current_year = datetime.now().year
+    return parsed_datetime.replace(year=current_year)
+def format_schedule_time(value):
+    if value.minute == 0:
+        return value.strftime("%I%p").lstrip('0').lower()
+    return value.strftime("%I:%M%p").lstrip('0').lower()
+def build_schedule_custom_fields(start_datetime):
+    end_datetime = start_datetime + timedelta(hours=2)
+    return [
+        {"id": 9, "caption": "Start Date of Request", "value": start_datetime.strftime("%Y-%m-%dT00:00:00Z")},
+        {"id": 10, "caption": "Start Time of Request", "value": format_schedule_time(start_datetime)},
+        {"id": 11, "caption": "End Date of Request", "value": end_datetime.strftime("%Y-%m-%dT00:00:00Z")},
+        {"id": 12, "caption": "End Time of Request", "value": format_schedule_time(end_datetime)}]
+def build_dispatch_summary(current_summary, start_datetime):
+    new_date_str = start_datetime.strftime("%A, %B %d, %Y")
+    new_date_str = new_date_str.replace(" 0", " ")
+    match = SUMMARY_DATE_PATTERN.search(current_summary)
+    if match:
+        return SUMMARY_DATE_PATTERN.sub(new_date_str, current_summary)
+    return f"{current_summary} {new_date_str}"
+def dispatch_ticket(headers, base_url, ticket_id, ticket_data, technician, eta, limiter=None):
+    start_datetime = parse_eta(eta)
+    if not start_datetime:
+        return {"ok": False, "steps": {}, "errors": [ETA_FORMAT_ERROR], "ticket": None}
+    full_name = f"{technician['FIRST_NAME']} {technician['LAST_NAME']}"
+    note_text = (
+        f"Name: {full_name}\n"
+        f"Mail: {technician['SURYL_EMAIL']}\n"
+        f"ETA: {eta}")
+    status_result = get_status_by_name(headers, base_url, ticket_data['board']['id'], "Dispatched")
+    dispatched_status_object = status_result.value
+    ticket_patch = [
+        {"op": "replace", "path": "summary", "value": build_dispatch_summary(ticket_data.get('summary', ''), start_datetime)},
+        {"op": "replace", "path": "customFields", "value": [
+            {"id": 23, "caption": "Tech ID", "value": technician['FIELD_NATION_ID']}] + build_schedule_custom_fields(start_datetime)}]
+    if dispatched_status_object:
+        ticket_patch.append({"op": "replace", "path": "status", "value": dispatched_status_object})
+    with thread_pool(2) as executor:
+        if limiter:
+            limiter.wait()
+        note_future = executor.submit(add_connectwise_ticket_note, headers, base_url, ticket_id, note_text)
+        if limiter:
+            limiter.wait()
+        patch_future = executor.submit(update_connectwise_ticket, headers, base_url, ticket_id, ticket_patch)
+        note_result = note_future.result()
+        patch_result = patch_future.result()
+    updated_ticket = patch_result.value
+    steps = {
+        "Discussion note": bool(note_result.value),
+        "Summary": bool(updated_ticket),
+        "Tech ID": bool(updated_ticket),
+        "Scheduling details": bool(updated_ticket),
+        "Status": bool(updated_ticket and dispatched_status_object)}
+    errors = status_result.errors + note_result.errors + patch_result.errors
+    if not note_result.value:
+        errors.append("Failed to add discussion note to ticket.")
+    if not updated_ticket:
+        errors.append("Failed to update the ticket summary, Tech ID, scheduling details and status.")
+    elif not dispatched_status_object:
+        errors.append("Could not find 'Dispatched' status on this board.")
+    return {"ok": not errors, "steps": steps, "errors": errors, "ticket": updated_ticket}
+def describe_scheduling_window(custom_fields_dict, priority_name):
+    start_date_str = custom_fields_dict.get('Start Date of Request', None)
+    start_time = custom_fields_dict.get('Start Time of Request', None)
+    end_date_str = custom_fields_dict.get('End Date of Request', None)
+    end_time = custom_fields_dict.get('End Time of Request', None)
+    start_date_obj = datetime.strptime(start_date_str.split('T')[0], "%Y-%m-%d").date() if start_date_str else None
+    end_date_obj = datetime.strptime(end_date_str.split('T')[0], "%Y-%m-%d").date() if end_date_str else None
+    start_date_display = start_date_str.split('T')[0] if start_date_str else 'None'
+    end_date_display = end_date_str.split('T')[0] if end_date_str else 'None'
+    if start_date_obj and end_date_obj and start_date_obj == end_date_obj:
+        return [("markdown", f"**Type:** Hard Start"), ("markdown", f"The activity is a **hard start** for {start_date_display} at {start_time}.")]
+    elif start_date_str and start_time and end_date_str and end_time:
+        return [("markdown", f"**Type:** Schedulable Window"), ("markdown", f"The activity can be scheduled between {start_date_display} at {start_time} and {end_date_display} at {end_time}.")]
+    elif start_date_str and start_time and end_date_str and not end_time:
+        return [("markdown", f"**Type:** Schedulable Window"), ("markdown", f"The activity can be scheduled between {start_date_display} at {start_time} and {end_date_display} at {start_time}.")]
+    elif start_date_str and start_time and not end_date_str and not end_time:
+        return [("markdown", f"**Type:** Hard Start"), ("markdown", f"The activity is a **hard start** for {start_date_display} at {start_time}.")]
+    elif priority_name in ["1 - Critical", "2 - High"] and not start_date_str and not start_time:
+        if end_date_str and end_time:
+            return [("markdown", f"**Type:** Hard Start (Deadline)"), ("markdown", f"Tech must be on site **before** {end_date_display} at {end_time}.")]
+        return [("markdown", f"**Type:** Hard Start (Deadline)"), ("warning", "Critical/High priority ticket with no clear deadline specified.")]
+    return [("info", "No scheduling window details found.")]
+@instrumented("build_ticket_view")
+def build_ticket_view(ticket_data, ticket_notes):
+    full_description = first_note_text(ticket_notes)
+    site_name = ticket_data.get('site', {}).get('name')
+    priority_name = ticket_data.get('priority', {}).get('name')
+    note_fields = parse_note_fields(full_description)
+    new_site_name = None
+    if site_name == "Additional Site":
+        new_site_name = note_fields['sites_continued']
+    scheduling_details = None
+    scheduling_window = None
+    if 'customFields' in ticket_data and isinstance(ticket_data['customFields'], list):
+        custom_fields_dict = {cf['caption']: cf.get('value') for cf in ticket_data['customFields']}
+        start_date_str = custom_fields_dict.get('Start Date of Request', None)
+        end_date_str = custom_fields_dict.get('End Date of Request', None)
+        start_date_display = start_date_str.split('T')[0] if start_date_str and 'T' in start_date_str else start_date_str
+        end_date_display = end_date_str.split('T')[0] if end_date_str and 'T' in end_date_str else end_date_str
+        start_time = custom_fields_dict.get('Start Time of Request', None)
+        end_time = custom_fields_dict.get('End Time of Request', None)
+        end_time_display = end_time
+        if start_date_str and end_date_str and start_time and not end_time:
+            end_time_display = start_time
+        scheduling_details = [
+            ("Start Date of Request", start_date_display),
+            ("Start Time of Request", start_time),
+            ("End Date of Request", end_date_display),
+            ("End Time of Request", end_time_display)]
+        scheduling_window = describe_scheduling_window(custom_fields_dict, priority_name)
+    return {
+        'ticket': ticket_data,
+        'notes': ticket_notes,
+        'full_description': full_description,
+        'site_name': site_name,
+        'priority_name': priority_name,
+        'site_code': site_code_from_name(site_name, default=site_name),
+        'new_site_name': new_site_name,
+        'hp_now_ticket': note_fields['hp_now_ticket'],
+        'scheduling_details': scheduling_details,
+        'scheduling_window': scheduling_window}
+def parse_bulk_dispatch_text(text):
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        parts = [part.strip() for part in line.split(',', 2)]
+        if [part.lower() for part in parts] == BULK_DISPATCH_COLUMNS:
+            continue
+        parts += [''] * (3 - len(parts))
+        rows.append(dict(zip(BULK_DISPATCH_COLUMNS, parts)))
+    return pd.DataFrame(rows, columns=BULK_DISPATCH_COLUMNS)
+def find_roster_technician(roster, tech):
+    if roster is None or roster.empty or not tech:
+        return None
+    full_names = (roster['FIRST_NAME'] + ' ' + roster['LAST_NAME']).str.strip().str.lower()
+    matches = roster[(full_names == tech.lower()) | (roster['FIELD_NATION_ID'].astype(str) == tech)]
+    if matches.empty:
+        return None
+    return matches.iloc[0].to_dict()
+def bulk_dispatch_ticket(headers, base_url, ticket_id, tech, eta, limiter, roster_loader):
+    result = {'Ticket ID': ticket_id, 'Technician': tech, 'ETA': eta, 'Result': 'Failed', 'Completed': '', 'Errors': ''}
+    if not ticket_id or not tech or not eta:
+        result['Errors'] = "Each row needs a ticket ID, technician and ETA."
+        return result
+    if not parse_eta(eta):
+        result['Errors'] = ETA_FORMAT_ERROR
+        return result
+    limiter.wait()
+    ticket_result = get_connectwise_single_ticket(headers, base_url, ticket_id, fields=RUNBOOK_TICKET_FIELDS)
+    ticket_data = ticket_result.value
+    if not ticket_data:
+        result['Errors'] = ' '.join([f"Could not find ticket with ID: {ticket_id}."] + ticket_result.errors)
+        return result
+    site_name = ticket_data.get('site', {}).get('name')
+    site_code = site_code_from_name(site_name, default=site_name)
+    if not site_code or site_code == 'Additional Site':
+        result['Errors'] = "Could not determine a site code from the ticket."
+        return result
+    roster_result = roster_loader(site_code)
+    technician = find_roster_technician(roster_result.value, tech)
+    if not technician:
+        result['Errors'] = ' '.join([f"'{tech}' is not a badged technician for site '{site_code}'."] + roster_result.errors)
+        return result
+    outcome = dispatch_ticket(headers, base_url, ticket_id, ticket_data, technician, eta, limiter=limiter)
+    result['Technician'] = f"{technician['FIRST_NAME']} {technician['LAST_NAME']}"
+    result['Result'] = 'Dispatched' if outcome['ok'] else ('Partial' if any(outcome['steps'].values()) else 'Failed')
+    result['Completed'] = ', '.join(step for step, succeeded in outcome['steps'].items() if succeeded)
+    result['Errors'] = ' '.join(outcome['errors'])
+    return result
+def bulk_dispatch_tickets(headers, base_url, rows, max_workers, roster_loader, progress=None):
+    limiter = get_connectwise_rate_limiter(base_url)
+    results = []
+    with thread_pool(max_workers) as executor:
+        futures = [
+            executor.submit(bulk_dispatch_ticket, headers, base_url, row['ticket_id'], row['tech'], row['eta'], limiter, roster_loader)
+            for row in rows]
+        for future in futures:
+            results.append(future.result())
+            if progress:
+                progress(f"Dispatched {len(results)} of {len(futures)} tickets...", len(results) / len(futures))
+    return Result(pd.DataFrame(results))
@@ -0,0 +1,85 @@
+import csv
+import os
+import shutil
+import tempfile
+from datetime import time
+
+import pandas as pd
+
+from dxc_core.instrumentation import instrumented
+
+REPORT_EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet")}
+REPORT_DATE_COLUMNS = ['Check In Date', 'Check Out Date']
+REPORT_TIME_COLUMNS = ['Check In Time', 'Check Out Time']
+REPORT_INTEGER_COLUMNS = ['Suryl Ticket #']
+
+class TicketReportExporter:
+    def __init__(self, columns, formats, file_stem="dxc_connectwise_tickets", directory=None, constant_memory=True):
+        self.columns = columns
+        self.directory = directory or tempfile.mkdtemp(prefix="dxc_report_")
+        self.paths = {export_format: os.path.join(self.directory, f"{file_stem}.{REPORT_EXPORT_FORMATS[export_format][0]}") for export_format in formats}
+        self.row_count = 0
+        self.workbook = None
+        self.csv_file = None
+        self.parquet_writer = None
+        if "Parquet" in self.paths:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self.pa = pa
+            self.parquet_schema = pa.schema([
+                (column, pa.date32() if column in REPORT_DATE_COLUMNS else pa.time64("us") if column in REPORT_TIME_COLUMNS else pa.int64() if column in REPORT_INTEGER_COLUMNS else pa.string())
+                for column in columns])
+            self.parquet_writer = pq.ParquetWriter(self.paths["Parquet"], self.parquet_schema)
+        if "Excel" in self.paths:
+            import xlsxwriter
+            self.workbook = xlsxwriter.Workbook(self.paths["Excel"], {"constant_memory": constant_memory})
+            self.worksheet = self.workbook.add_worksheet("Tickets")
+            self.date_format = self.workbook.add_format({"num_format": "yyyy-mm-dd"})
+            self.time_format = self.workbook.add_format({"num_format": "hh:mm AM/PM"})
+            header_format = self.workbook.add_format({"bold": True})
+            for column_index, column in enumerate(columns):
+                self.worksheet.write_string(0, column_index, column, header_format)
+        if "CSV" in self.paths:
+            self.csv_file = open(self.paths["CSV"], "w", newline="", encoding="utf-8")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(columns)
+    @instrumented("export_report_frame")
+    def write_frame(self, frame):
+        column_values = [[value if pd.notna(value) else None for value in frame[column]] for column in self.columns]
+        rows = list(zip(*column_values))
+        if self.workbook:
+            date_columns = {self.columns.index(column) for column in REPORT_DATE_COLUMNS if column in self.columns}
+            time_columns = {self.columns.index(column) for column in REPORT_TIME_COLUMNS if column in self.columns}
+            for row_offset, row in enumerate(rows, start=self.row_count + 1):
+                for column_index, value in enumerate(row):
+                    if value is None:
+                        continue
+                    if column_index in date_columns:
+                        self.worksheet.write_datetime(row_offset, column_index, value, self.date_format)
+                    elif column_index in time_columns:
+                        self.worksheet.write_datetime(row_offset, column_index, value, self.time_format)
+                    else:
+                        self.worksheet.write(row_offset, column_index, value.item() if hasattr(value, 'item') else value)
+        if self.csv_file:
+            self.csv_writer.writerows(
+                ['' if value is None else value.strftime('%I:%M %p') if isinstance(value, time) else value for value in row]
+                for row in rows)
+        if self.parquet_writer:
+            arrays = [
+                self.pa.array(values if not self.pa.types.is_string(field.type) else [None if value is None else str(value) for value in values], type=field.type)
+                for field, values in zip(self.parquet_schema, column_values)]
+            self.parquet_writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.parquet_schema))
+        self.row_count += len(rows)
+    def close(self):
+        if self.workbook:
+            self.workbook.close()
+        if self.csv_file:
+            self.csv_file.close()
+        if self.parquet_writer:
+            self.parquet_writer.close()
+        return self.paths
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
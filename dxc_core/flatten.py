@@ -0,0 +1,163 @@
+from datetime import datetime
+
+import pandas as pd
+
+from dxc_core.connectwise import get_connectwise_notes_for_tickets
+from dxc_core.instrumentation import instrumented
+from dxc_core.notes import HP_NOW_TICKET_PATTERN, first_note_text
+from dxc_core.results import Result
+from dxc_core.rules import get_billing_rules, site_code_from_name
+
+CUSTOM_FIELD_COLUMN_MAPPING = {
+    'check-in': 'CW-Check-In (Custom Field)',
+    'check-out': 'CW-Check-Out (Custom Field)',
+    'total hours': 'CW-Total Hours (Custom Field)',
+    'technician name': 'CW-Technician Name (Custom Field)',
+    'description': 'CW-Description (Custom Field)'}
+REPORT_COLUMNS_TO_KEEP = [
+    ('HP Now Ticket #', 'HP Now Ticket #'),
+    ('id', 'Suryl Ticket #'),
+    ('summary', 'Summary'),
+    ('site', 'Site Name'),
+    ('siteName', 'Site Name'),
+    ('status', 'Status'),
+    ('type', 'Type'),
+    ('subType', 'SubType'),
+    ('Item', 'Item'),
+    ('priority', 'Priority'),
+    ('CW-Technician Name (Custom Field)', 'Technician Name'),
+    ('Check in Date', 'Check In Date'),
+    ('Check in Time', 'Check In Time'),
+    ('Check Out Date', 'Check Out Date'),
+    ('Check Out Time', 'Check Out Time'),
+    ('CW-Total Hours (Custom Field)', 'Total Hours')]
+
+def custom_field_column_name(caption):
+    caption_lower = caption.lower()
+    for match_key, new_key in CUSTOM_FIELD_COLUMN_MAPPING.items():
+        if match_key in caption_lower:
+            return new_key
+    return f"CW-{caption} (Custom Field)"
+def resolve_ticket_notes(tickets, headers, base_url, notes_by_ticket=None, notes_provider=None):
+    notes_by_ticket = dict(notes_by_ticket or {})
+    missing_note_ids = [ticket['id'] for ticket in tickets if ticket['id'] not in notes_by_ticket]
+    if not missing_note_ids:
+        return Result(notes_by_ticket)
+    if notes_provider is not None:
+        notes_by_ticket.update(notes_provider(missing_note_ids))
+        return Result(notes_by_ticket)
+    notes_result = get_connectwise_notes_for_tickets(headers, base_url, missing_note_ids)
+    notes_by_ticket.update(notes_result.value)
+    return Result(notes_by_ticket, notes_result.errors)
+@instrumented("flatten_ticket_data")
+def flatten_ticket_data(tickets, headers, base_url, notes_by_ticket=None, notes_provider=None):
+    flattened_tickets = []
+    billing_rules = get_billing_rules()
+    notes_result = resolve_ticket_notes(tickets, headers, base_url, notes_by_ticket, notes_provider)
+    for ticket in tickets:
+        flattened_ticket = {}
+        full_description = first_note_text(notes_result.value.get(ticket['id']))
+        flattened_ticket['Full Description'] = full_description
+        hp_now_ticket_value = None
+        if full_description:
+            match = HP_NOW_TICKET_PATTERN.search(full_description)
+            if match:
+                hp_now_ticket_value = match.group(1).strip()
+        flattened_ticket['HP Now Ticket #'] = hp_now_ticket_value
+        flattened_ticket['Type'] = ticket.get('type', {}).get('name', 'N/A')
+        flattened_ticket['Subtype'] = ticket.get('subType', {}).get('name', 'N/A')
+        flattened_ticket['Item'] = ticket.get('item', {}).get('name', 'N/A')
+        for key, value in ticket.items():
+            if isinstance(value, dict) and 'name' in value:
+                flattened_ticket[key] = value['name']
+            elif key == 'customFields' and isinstance(value, list):
+                for custom_field in value:
+                    if 'caption' in custom_field:
+                        flattened_ticket[custom_field_column_name(custom_field['caption'])] = custom_field.get('value', None)
+            else:
+                flattened_ticket[key] = value
+        flattened_ticket['SLA'] = billing_rules.sla_tier(flattened_ticket.get('priority'), site_code_from_name(flattened_ticket.get('site')))
+        flattened_tickets.append(flattened_ticket)
+    return Result(flattened_tickets, notes_result.errors)
+def flatten_single_ticket(ticket, headers, base_url, ticket_notes=None, notes_provider=None):
+    notes_by_ticket = {ticket['id']: ticket_notes} if ticket_notes is not None else None
+    result = flatten_ticket_data([ticket], headers, base_url, notes_by_ticket, notes_provider)
+    result.value = result.value[0]
+    return result
+@instrumented("flatten_ticket_frame")
+def flatten_ticket_frame(tickets, headers, base_url, notes_by_ticket=None, notes_provider=None):
+    if not tickets:
+        return Result(pd.DataFrame())
+    notes_result = resolve_ticket_notes(tickets, headers, base_url, notes_by_ticket, notes_provider)
+    notes_by_ticket = notes_result.value
+    row_count = len(tickets)
+    missing = float('nan')
+    ticket_key_orders = list(map(tuple, tickets))
+    ticket_keys = dict.fromkeys(key for key_order in dict.fromkeys(ticket_key_orders) for key in key_order)
+    full_description = [(notes_by_ticket.get(ticket['id']) or [{}])[0].get('text', '') for ticket in tickets]
+    hp_now_matches = map(HP_NOW_TICKET_PATTERN.search, [text or '' for text in full_description])
+    columns = {
+        'Full Description': full_description,
+        'HP Now Ticket #': [match.group(1).strip() if match else None for match in hp_now_matches]}
+    for new_key, old_key in [('Type', 'type'), ('Subtype', 'subType'), ('Item', 'item')]:
+        columns[new_key] = [value.get('name', 'N/A') if isinstance(value, dict) else 'N/A' for value in (ticket.get(old_key) for ticket in tickets)]
+    custom_columns_by_row = [None] * row_count
+    for key in ticket_keys:
+        values = [ticket.get(key, missing) for ticket in tickets]
+        if key != 'customFields':
+            columns[key] = [value['name'] if isinstance(value, dict) and 'name' in value else value for value in values]
+            continue
+        column_names = {}
+        non_list_values = [missing] * row_count
+        for row, custom_fields in enumerate(values):
+            if not isinstance(custom_fields, list):
+                if custom_fields == custom_fields:
+                    non_list_values[row] = custom_fields['name'] if isinstance(custom_fields, dict) and 'name' in custom_fields else custom_fields
+                continue
+            row_columns = {}
+            for custom_field in custom_fields:
+                if 'caption' in custom_field:
+                    caption = custom_field['caption']
+                    column = column_names.get(caption) or column_names.setdefault(caption, custom_field_column_name(caption))
+                    if column not in columns:
+                        columns[column] = [missing] * row_count
+                    columns[column][row] = custom_field.get('value', None)
+                    row_columns[column] = None
+            custom_columns_by_row[row] = tuple(row_columns)
+        columns['customFields'] = non_list_values
+    priority = [value if isinstance(value, str) else None for value in columns.get('priority', [None] * row_count)]
+    site_code = [site_code_from_name(site) for site in columns.get('site', [None] * row_count)]
+    columns['SLA'] = get_billing_rules().sla_tiers(priority, site_code).tolist()
+    column_order = dict.fromkeys(['Full Description', 'HP Now Ticket #', 'Type', 'Subtype', 'Item'])
+    for key_order, custom_columns in dict.fromkeys(zip(ticket_key_orders, custom_columns_by_row)):
+        for key in key_order:
+            if key == 'customFields' and custom_columns is not None:
+                column_order.update(dict.fromkeys(custom_columns))
+            else:
+                column_order[key] = None
+        column_order['SLA'] = None
+    return Result(pd.DataFrame({column: columns[column] for column in column_order}), notes_result.errors)
+@instrumented("build_ticket_report_frame")
+def build_ticket_report_frame(flattened_tickets):
+    df = flattened_tickets if isinstance(flattened_tickets, pd.DataFrame) else pd.DataFrame(flattened_tickets)
+    source_columns = {column: df[column] for column in df.columns}
+    for col, prefix in [('CW-Check-In (Custom Field)', 'Check in'), ('CW-Check-Out (Custom Field)', 'Check Out')]:
+        if col in df.columns:
+            timestamps = pd.to_datetime(df[col], errors='coerce')
+            source_columns[f'{prefix} Date'] = timestamps.dt.date
+            source_columns[f'{prefix} Time'] = timestamps.dt.time
+    missing_column = pd.Series(None, index=df.index, dtype=object)
+    report_columns = {}
+    for old_key, new_key in REPORT_COLUMNS_TO_KEEP:
+        report_columns[new_key] = source_columns.get(old_key, missing_column)
+    return pd.DataFrame(report_columns, index=df.index).reset_index(drop=True)
+def report_export_columns():
+    return list(dict.fromkeys(new_key for _, new_key in REPORT_COLUMNS_TO_KEEP))
+def parse_cw_timestamp(timestamp_str):
+    if not timestamp_str or not isinstance(timestamp_str, str):
+        return None, None
+    try:
+        dt_obj = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
+        return dt_obj.date(), dt_obj.strftime("%I:%M %p")
+    except ValueError:
+        return None, None
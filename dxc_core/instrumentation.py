@@ -0,0 +1,116 @@
+import json
+import threading
+from datetime import datetime
+from functools import wraps
+from time import monotonic
+
+from dxc_core.runtime import set_thread_initializer_factory
+
+LATENCY_BUCKETS_SECONDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+N_PLUS_ONE_CALL_THRESHOLD = 20
+METRICS_PROVIDERS = []
+THREAD_METRICS = threading.local()
+
+class RenderMetrics:
+    def __init__(self, page):
+        self.page = page
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.lock = threading.Lock()
+        self.operations = {}
+    def record(self, kind, operation, seconds, bytes_count=0, error=False):
+        bucket_index = next((index for index, bound in enumerate(LATENCY_BUCKETS_SECONDS) if seconds <= bound), len(LATENCY_BUCKETS_SECONDS))
+        with self.lock:
+            stats = self.operations.setdefault((kind, operation), {"count": 0, "errors": 0, "bytes": 0, "total_seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS_SECONDS) + 1)})
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["bytes"] += bytes_count or 0
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["buckets"][bucket_index] += 1
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(stats, buckets=list(stats["buckets"])) for key, stats in sorted(self.operations.items())}
+    def rows(self):
+        rows = []
+        for (kind, operation), stats in self.snapshot().items():
+            p95_rank = 0.95 * stats["count"]
+            cumulative = 0
+            p95_seconds = stats["max_seconds"]
+            for bound, bucket_count in zip(LATENCY_BUCKETS_SECONDS, stats["buckets"]):
+                cumulative += bucket_count
+                if cumulative >= p95_rank:
+                    p95_seconds = min(bound, stats["max_seconds"])
+                    break
+            rows.append({
+                "Kind": kind, "Operation": operation, "Calls": stats["count"], "Errors": stats["errors"], "KB": round(stats["bytes"] / 1024, 1),
+                "Avg ms": round(1000 * stats["total_seconds"] / stats["count"], 1), "p95 ms": round(1000 * p95_seconds, 1), "Max ms": round(1000 * stats["max_seconds"], 1)})
+        return rows
+    def repeated_calls(self):
+        return [(kind, operation, stats["count"]) for (kind, operation), stats in self.snapshot().items() if kind != "local" and "{id}" in operation and stats["count"] >= N_PLUS_ONE_CALL_THRESHOLD]
+    def to_json(self):
+        return json.dumps({
+            "page": self.page,
+            "started_at": self.started_at,
+            "latency_buckets_seconds": LATENCY_BUCKETS_SECONDS,
+            "operations": [{"kind": kind, "operation": operation, **stats} for (kind, operation), stats in self.snapshot().items()]}, indent=2)
+    def to_prometheus(self):
+        def labels(kind, operation, **extra):
+            label_values = {"page": self.page, "kind": kind, "operation": operation, **extra}
+            return ",".join(f'{name}="{prometheus_label_value(value)}"' for name, value in label_values.items())
+        snapshot = self.snapshot()
+        lines = []
+        for metric, help_text, field in [
+                ("dxc_operation_calls_total", "Calls per operation during the page render.", "count"),
+                ("dxc_operation_errors_total", "Failed calls per operation during the page render.", "errors"),
+                ("dxc_operation_bytes_total", "Response bytes per operation during the page render.", "bytes")]:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{{{labels(kind, operation)}}} {stats[field]}" for (kind, operation), stats in snapshot.items()]
+        lines += ["# HELP dxc_operation_duration_seconds Operation latency during the page render.", "# TYPE dxc_operation_duration_seconds histogram"]
+        for (kind, operation), stats in snapshot.items():
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS_SECONDS + ["+Inf"], stats["buckets"]):
+                cumulative += bucket_count
+                lines.append(f"dxc_operation_duration_seconds_bucket{{{labels(kind, operation, le=bound)}}} {cumulative}")
+            lines.append(f"dxc_operation_duration_seconds_sum{{{labels(kind, operation)}}} {stats['total_seconds']:.6f}")
+            lines.append(f"dxc_operation_duration_seconds_count{{{labels(kind, operation)}}} {stats['count']}")
+        return "\n".join(lines) + "\n"
+def prometheus_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+def set_metrics_provider(provider):
+    METRICS_PROVIDERS[:] = [provider] if provider else []
+def set_thread_metrics(metrics):
+    THREAD_METRICS.metrics = metrics
+def thread_metrics_initializer():
+    metrics = getattr(THREAD_METRICS, "metrics", None)
+    return lambda: set_thread_metrics(metrics)
+set_thread_initializer_factory(thread_metrics_initializer, "metrics")
+def current_metrics():
+    metrics = getattr(THREAD_METRICS, "metrics", None)
+    if metrics is not None:
+        return metrics
+    return METRICS_PROVIDERS[0]() if METRICS_PROVIDERS else None
+def record_operation(kind, operation, seconds, bytes_count=0, error=False):
+    metrics = current_metrics()
+    if metrics:
+        metrics.record(kind, operation, seconds, bytes_count, error)
+def instrumented(operation):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = monotonic()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                record_operation("local", operation, monotonic() - started, error=True)
+                raise
+            record_operation("local", operation, monotonic() - started)
+            return result
+        return wrapper
+    return decorator
+def mark_supabase_request(request):
+    request.extensions["dxc_started"] = monotonic()
+def record_supabase_response(response):
+    response.read()
+    request = response.request
+    table = request.url.path.rsplit("/rest/v1/", 1)[-1]
+    record_operation("supabase", f"{request.method} {table}", monotonic() - request.extensions.get("dxc_started", monotonic()), len(response.content), response.status_code >= 400)
@@ -0,0 +1,141 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import monotonic
+
+from dxc_core.instrumentation import RenderMetrics, set_thread_metrics
+from dxc_core.results import Result
+from dxc_core.runtime import get_setting, process_resource
+
+JOB_MAX_WORKERS = 4
+JOB_RESULT_TTL_SECONDS = 3600
+JOB_QUEUED = "Queued"
+JOB_RUNNING = "Running"
+JOB_DONE = "Done"
+JOB_FAILED = "Failed"
+
+class Job:
+    def __init__(self, key, description, cleanup=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.description = description
+        self.cleanup = cleanup
+        self.lock = threading.Lock()
+        self.state = JOB_QUEUED
+        self.message = "Waiting for a free worker..."
+        self.fraction = None
+        self.result = None
+        self.preview = None
+        self.metrics = RenderMetrics(description)
+        self.subscribers = 1
+        self.submitted_at = datetime.now().isoformat(timespec="seconds")
+        self.started = None
+        self.finished = None
+        self.last_read = None
+    @property
+    def done(self):
+        return self.state in (JOB_DONE, JOB_FAILED)
+    def report(self, message, fraction=None, preview=None):
+        with self.lock:
+            self.message = message
+            self.fraction = fraction
+            if preview is not None:
+                self.preview = preview
+    def start(self):
+        with self.lock:
+            self.state = JOB_RUNNING
+            self.message = "Starting..."
+            self.started = monotonic()
+    def finish(self, result):
+        with self.lock:
+            self.result = result
+            self.finished = monotonic()
+            self.fraction = 1.0
+            self.message = "Finished." if result.value is not None else "; ".join(result.errors)
+            self.state = JOB_DONE if result.value is not None else JOB_FAILED
+            self.preview = None
+    def expired(self, now, ttl_seconds):
+        with self.lock:
+            return self.done and now - max(self.finished, self.last_read or 0) > ttl_seconds
+    def elapsed_seconds(self):
+        with self.lock:
+            if self.started is None:
+                return 0.0
+            return (self.finished or monotonic()) - self.started
+    def stats(self):
+        with self.lock:
+            state, message, subscribers = self.state, self.message, self.subscribers
+        return {"Job": self.id, "Description": self.description, "State": state, "Progress": message, "Sessions": subscribers, "Submitted": self.submitted_at, "Seconds": round(self.elapsed_seconds(), 1)}
+
+class JobRunner:
+    def __init__(self, max_workers, result_ttl_seconds):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="dxc_job")
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.in_flight = {}
+    def submit(self, key, description, function, *args, cleanup=None, **kwargs):
+        with self.lock:
+            self.prune()
+            running_job = self.jobs.get(self.in_flight.get(key))
+            if running_job:
+                with running_job.lock:
+                    running_job.subscribers += 1
+                return running_job
+            job = Job(key, description, cleanup)
+            self.jobs[job.id] = job
+            self.in_flight[key] = job.id
+        self.executor.submit(self.run, job, function, args, kwargs)
+        return job
+    def run(self, job, function, args, kwargs):
+        job.start()
+        set_thread_metrics(job.metrics)
+        try:
+            result = function(*args, progress=job.report, **kwargs)
+        except Exception as e:
+            result = Result.failure(f"{job.description} failed: {e}")
+        finally:
+            set_thread_metrics(None)
+        with self.lock:
+            self.in_flight.pop(job.key, None)
+            job.finish(result)
+            if job.subscribers <= 0:
+                self.remove(job)
+    def get(self, job_id):
+        with self.lock:
+            self.prune()
+            job = self.jobs.get(job_id)
+            if job:
+                with job.lock:
+                    job.last_read = monotonic()
+            return job
+    def release(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            with job.lock:
+                job.subscribers -= 1
+            if job.done and job.subscribers <= 0:
+                self.remove(job)
+    def stats(self):
+        with self.lock:
+            self.prune()
+            jobs = list(self.jobs.values())
+        return [job.stats() for job in reversed(jobs)]
+    def prune(self):
+        now = monotonic()
+        for job in list(self.jobs.values()):
+            if job.expired(now, self.result_ttl_seconds):
+                self.remove(job)
+    def remove(self, job):
+        del self.jobs[job.id]
+        if job.cleanup and job.result.value is not None:
+            job.cleanup(job.result.value)
+
+@process_resource
+def get_job_runner():
+    return JobRunner(
+        get_setting("job_max_workers", JOB_MAX_WORKERS),
+        get_setting("job_result_ttl_seconds", JOB_RESULT_TTL_SECONDS))
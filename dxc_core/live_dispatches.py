@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from time import sleep
+
+import pandas as pd
+
+from dxc_core.results import Result
+from dxc_core.runtime import process_resource
+from dxc_core.supabase_client import describe_supabase_error, get_supabase_client, get_supabase_credentials, is_rejected_row_error
+
+LIVE_DISPATCH_QUEUE_PATH = "dxc_live_dispatch_queue.jsonl"
+LIVE_DISPATCH_REJECTED_PATH = "dxc_live_dispatch_rejected.jsonl"
+LIVE_DISPATCH_BATCH_SIZE = 50
+LIVE_DISPATCH_RETRY_SECONDS = 30
+LIVE_DISPATCH_PAGE_SIZE = 1000
+
+class LiveDispatchWriter:
+    def __init__(self, supabase_loader, queue_path, batch_size, retry_seconds, rejected_path):
+        self.supabase_loader = supabase_loader
+        self.queue_path = queue_path
+        self.rejected_path = rejected_path
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = OrderedDict()
+        self.rejected = []
+        self.inserted = 0
+        self.duplicates = 0
+        self.last_error = None
+        self.retry_thread = None
+        if os.path.exists(queue_path):
+            with open(queue_path, encoding="utf-8") as queue_file:
+                for line in queue_file:
+                    if line.strip():
+                        row = json.loads(line)
+                        self.pending[str(row['SURYLID'])] = row
+        if os.path.exists(rejected_path):
+            with open(rejected_path, encoding="utf-8") as rejected_file:
+                self.rejected = [json.loads(line) for line in rejected_file if line.strip()]
+        if self.pending:
+            self.schedule_retry()
+    def save_queue(self):
+        temp_path = f"{self.queue_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as queue_file:
+            for row in self.pending.values():
+                queue_file.write(json.dumps(row) + "\n")
+        os.replace(temp_path, self.queue_path)
+    def save_rejected(self, rejected_rows):
+        self.rejected.extend(rejected_rows)
+        with open(self.rejected_path, "a", encoding="utf-8") as rejected_file:
+            for rejected_row in rejected_rows:
+                rejected_file.write(json.dumps(rejected_row) + "\n")
+    def insert_rows(self, supabase, rows_by_id, new_ids):
+        try:
+            supabase.table('live_dispatches').insert([rows_by_id[surylid] for surylid in new_ids]).execute()
+            return new_ids, {}
+        except Exception as e:
+            if not is_rejected_row_error(e):
+                raise
+            if len(new_ids) == 1:
+                return [], {new_ids[0]: describe_supabase_error(e)}
+        inserted_ids = []
+        rejected_errors = {}
+        for surylid in new_ids:
+            try:
+                supabase.table('live_dispatches').insert([rows_by_id[surylid]]).execute()
+                inserted_ids.append(surylid)
+            except Exception as e:
+                if not is_rejected_row_error(e):
+                    raise
+                rejected_errors[surylid] = describe_supabase_error(e)
+        return inserted_ids, rejected_errors
+    def submit(self, rows, flush=True):
+        with self.lock:
+            for row in rows:
+                self.pending[str(row['SURYLID'])] = row
+            self.save_queue()
+            should_flush = flush or len(self.pending) >= self.batch_size
+        if should_flush:
+            return self.flush()
+        return {"inserted": [], "duplicates": [], "rejected": [], "errors": [], "queued": [str(row['SURYLID']) for row in rows]}
+    def flush(self):
+        outcome = {"inserted": [], "duplicates": [], "rejected": [], "errors": [], "queued": []}
+        with self.flush_lock:
+            with self.lock:
+                rows_by_id = OrderedDict(self.pending)
+            surylids = list(rows_by_id)
+            try:
+                supabase = self.supabase_loader() if surylids else None
+                for start in range(0, len(surylids), self.batch_size):
+                    batch_ids = surylids[start:start + self.batch_size]
+                    response = supabase.table('live_dispatches').select('SURYLID').in_('SURYLID', batch_ids).execute()
+                    existing_ids = {str(row['SURYLID']) for row in response.data or []}
+                    new_ids = [surylid for surylid in batch_ids if surylid not in existing_ids]
+                    inserted_ids, rejected_errors = self.insert_rows(supabase, rows_by_id, new_ids) if new_ids else ([], {})
+                    rejected_at = datetime.now().isoformat(timespec="seconds")
+                    with self.lock:
+                        for surylid in batch_ids:
+                            if self.pending.get(surylid) is rows_by_id[surylid]:
+                                del self.pending[surylid]
+                        if rejected_errors:
+                            self.save_rejected([{"SURYLID": surylid, "Error": error, "Rejected At": rejected_at, "Row": rows_by_id[surylid]} for surylid, error in rejected_errors.items()])
+                        self.inserted += len(inserted_ids)
+                        self.duplicates += len(existing_ids)
+                        self.last_error = None
+                    outcome["inserted"].extend(inserted_ids)
+                    outcome["rejected"].extend(rejected_errors)
+                    outcome["errors"].extend(f"Supabase rejected the `live_dispatches` row for ticket {surylid}: {error}" for surylid, error in rejected_errors.items())
+                    outcome["duplicates"].extend(surylid for surylid in batch_ids if surylid in existing_ids)
+            except Exception as e:
+                with self.lock:
+                    self.last_error = str(e)
+            with self.lock:
+                self.save_queue()
+                outcome["queued"] = [surylid for surylid in surylids if surylid in self.pending]
+                if self.pending:
+                    self.schedule_retry()
+        return outcome
+    def schedule_retry(self):
+        if self.retry_thread and self.retry_thread.is_alive():
+            return
+        self.retry_thread = threading.Thread(target=self.retry_loop, daemon=True)
+        self.retry_thread.start()
+    def retry_loop(self):
+        while True:
+            sleep(self.retry_seconds)
+            with self.lock:
+                if not self.pending:
+                    return
+            self.flush()
+    def stats(self):
+        with self.lock:
+            return {"Queued": len(self.pending), "Inserted": self.inserted, "Duplicates Skipped": self.duplicates, "Rejected": len(self.rejected), "Last Error": self.last_error or ""}
+    def rejected_rows(self):
+        with self.lock:
+            return [{"SURYLID": rejected_row["SURYLID"], "Error": rejected_row["Error"], "Rejected At": rejected_row["Rejected At"]} for rejected_row in self.rejected]
+
+@process_resource
+def get_live_dispatch_writer_for(url, key):
+    return LiveDispatchWriter(lambda: get_supabase_client(url, key), LIVE_DISPATCH_QUEUE_PATH, LIVE_DISPATCH_BATCH_SIZE, LIVE_DISPATCH_RETRY_SECONDS, LIVE_DISPATCH_REJECTED_PATH)
+def get_live_dispatch_writer():
+    credentials = get_supabase_credentials()
+    if not credentials.ok:
+        return credentials
+    return Result(get_live_dispatch_writer_for(*credentials.value))
+def load_live_dispatches(supabase):
+    rows = []
+    try:
+        while True:
+            response = supabase.table('live_dispatches').select('*').range(len(rows), len(rows) + LIVE_DISPATCH_PAGE_SIZE - 1).execute()
+            rows.extend(response.data or [])
+            if len(response.data or []) < LIVE_DISPATCH_PAGE_SIZE:
+                return Result(pd.DataFrame(rows))
+    except Exception as e:
+        return Result.failure(f"Error querying Supabase: {e}")
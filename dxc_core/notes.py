@@ -0,0 +1,44 @@
+import re
+
+HP_NOW_TICKET_PATTERN = re.compile(r"HP Now Ticket #\s*([^\s\n]+)", re.IGNORECASE)
+NOTE_FIELD_PATTERN = re.compile(
+    r"(?=[HSP])(?:HP Now Ticket #(?=\s*(?P<hp_now_ticket>[^\s]+))"
+    r"|Sites Continued:?(?=\s*(?P<sites_continued>.*))"
+    r"|(?P<provider_closing_notes>Provider(?:'s|&#039;s|&#39;s|&apos;s)?\s+closing\s+notes:?))",
+    re.IGNORECASE)
+SUMMARY_DATE_PATTERN = re.compile(r"(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday), (January|February|March|April|May|June|July|August|September|October|November|December) \d+, \d{4}")
+NO_FIELD_NATION_NOTE = "No Field Nation internal note found."
+NO_PROVIDER_NOTES = "No provider notes found in the ticket's internal notes."
+
+def parse_note_fields(note_text):
+    note_fields = {'hp_now_ticket': None, 'sites_continued': None, 'actions_taken': None}
+    if not note_text:
+        return note_fields
+    provider_notes_start = None
+    for match in NOTE_FIELD_PATTERN.finditer(note_text):
+        if match.group('provider_closing_notes'):
+            provider_notes_start = match.end()
+        elif match.group('hp_now_ticket') is not None:
+            if note_fields['hp_now_ticket'] is None:
+                note_fields['hp_now_ticket'] = match.group('hp_now_ticket').strip()
+        elif note_fields['sites_continued'] is None:
+            note_fields['sites_continued'] = match.group('sites_continued').strip()
+    if provider_notes_start is not None:
+        note_fields['actions_taken'] = note_text[provider_notes_start:].strip()
+    return note_fields
+def first_note_text(ticket_notes):
+    if ticket_notes and len(ticket_notes) > 0 and 'text' in ticket_notes[0]:
+        return ticket_notes[0]['text']
+    return ''
+def find_field_nation_internal_note(ticket_notes):
+    if not ticket_notes:
+        return NO_FIELD_NATION_NOTE
+    for note in ticket_notes:
+        if note.get('createdBy') == 'FieldNationAPI' and note.get('internalAnalysisFlag') is True:
+            return note.get('text', "No text found in Field Nation internal note.")
+    return NO_FIELD_NATION_NOTE
+def extract_actions_taken(full_description):
+    actions_taken = parse_note_fields(full_description)['actions_taken']
+    if actions_taken is not None:
+        return actions_taken
+    return NO_PROVIDER_NOTES
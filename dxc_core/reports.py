@@ -0,0 +1,192 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+from time import monotonic
+
+import pandas as pd
+
+from dxc_core.connectwise import REPORT_TICKET_FIELDS, get_connectwise_auth_headers, get_connectwise_boards, iter_connectwise_ticket_pages
+from dxc_core.export import REPORT_EXPORT_FORMATS, TicketReportExporter
+from dxc_core.flatten import build_ticket_report_frame, flatten_ticket_frame, report_export_columns
+from dxc_core.instrumentation import RenderMetrics, set_metrics_provider
+from dxc_core.results import ConnectWiseError, Result
+from dxc_core.runtime import configure, process_resource
+from dxc_core.snapshots import write_ticket_snapshots
+from dxc_core.store import get_ticket_store, sync_connectwise_tickets
+
+DEFAULT_BOARD_NAME = "DXCSupport"
+DEFAULT_SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+DEFAULT_REPORT_DAYS = 7
+
+def export_format_for_path(output_path):
+    return next((export_format for export_format, (extension, _) in REPORT_EXPORT_FORMATS.items() if output_path.lower().endswith(f".{extension}")), None)
+def resolve_board_id(headers, base_url, board):
+    if str(board).isdigit():
+        return Result(int(board))
+    boards_result = get_connectwise_boards(headers, base_url)
+    board_id = next((board_data["id"] for board_data in boards_result.value or [] if board_data["name"] == board), None)
+    if board_id is None:
+        return Result.failure(*boards_result.errors, f"Could not find a board named '{board}'.")
+    return Result(board_id, boards_result.errors)
+def run_ticket_report(headers, base_url, board_id, start_date, end_date, output_path, on_page=None):
+    export_format = export_format_for_path(output_path)
+    if export_format is None:
+        return Result.failure(f"Unsupported report file type for {output_path}; use one of: {', '.join('.' + extension for extension, _ in REPORT_EXPORT_FORMATS.values())}.")
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    exporter = TicketReportExporter(report_export_columns(), [export_format], directory=tempfile.mkdtemp(prefix=".dxc_report_", dir=output_dir))
+    ticket_count = 0
+    errors = []
+    fetch_failed = False
+    try:
+        for tickets in iter_connectwise_ticket_pages(headers, base_url, board_id=board_id, start_date=start_date, end_date=end_date, parallel=True, fields=REPORT_TICKET_FIELDS):
+            frame_result = flatten_ticket_frame(tickets, headers, base_url)
+            errors += frame_result.errors
+            exporter.write_frame(build_ticket_report_frame(frame_result.value))
+            ticket_count += len(tickets)
+            if on_page:
+                on_page(ticket_count)
+    except ConnectWiseError as e:
+        errors += e.errors
+        fetch_failed = True
+    try:
+        export_paths = exporter.close()
+        if not fetch_failed:
+            os.replace(export_paths[export_format], output_path)
+    finally:
+        exporter.discard()
+    if fetch_failed:
+        return Result.failure(*errors)
+    return Result(ticket_count, errors)
+@process_resource
+def get_board_sync_lock(board_id):
+    return threading.Lock()
+def pull_board_report(headers, base_url, board_id, start_date, end_date, formats, full_resync=False, save_snapshot=False, progress=None):
+    progress = progress or (lambda message, fraction=None, preview=None: None)
+    ticket_store = get_ticket_store()
+    with get_board_sync_lock(board_id):
+        if full_resync:
+            ticket_store.reset_board(board_id)
+        progress("Syncing tickets changed since the last pull...")
+        sync_result = sync_connectwise_tickets(
+            headers,
+            base_url,
+            board_id,
+            start_date.replace(day=1) if save_snapshot else start_date,
+            (end_date.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1) if save_snapshot else end_date,
+            ticket_store,
+            on_page=lambda count: progress(f"Synced {count} tickets so far..."))
+    if sync_result.value is None:
+        return sync_result
+    warnings = []
+    try:
+        exporter = TicketReportExporter(report_export_columns(), formats)
+    except ImportError:
+        warnings.append("Parquet export requires `pyarrow`; exporting the other formats only.")
+        exporter = TicketReportExporter(report_export_columns(), [export_format for export_format in formats if export_format != "Parquet"])
+    errors = list(sync_result.errors)
+    report_frames = []
+    ticket_count = 0
+    for tickets, notes_by_ticket in ticket_store.iter_ticket_pages(board_id, start_date, end_date):
+        frame_result = flatten_ticket_frame(tickets, headers, base_url, notes_by_ticket)
+        errors += frame_result.errors
+        report_frame = build_ticket_report_frame(frame_result.value)
+        exporter.write_frame(report_frame)
+        report_frames.append(report_frame)
+        ticket_count += len(tickets)
+        progress(f"Loaded {ticket_count} tickets...", preview=list(report_frames))
+    export_paths = exporter.close()
+    snapshot_rows = None
+    if save_snapshot:
+        progress("Writing Parquet snapshots...")
+        try:
+            snapshot_result = write_ticket_snapshots(ticket_store, board_id, start_date, end_date, headers, base_url)
+            errors += snapshot_result.errors
+            snapshot_rows = snapshot_result.value
+        except ImportError:
+            warnings.append("Parquet snapshots require `pyarrow`.")
+    return Result({
+        "synced": sync_result.value,
+        "report": pd.concat(report_frames, ignore_index=True) if report_frames else pd.DataFrame(columns=report_export_columns()),
+        "exporter": exporter,
+        "export_paths": export_paths,
+        "snapshot_rows": snapshot_rows,
+        "warnings": warnings}, errors)
+def discard_board_report(report):
+    report["exporter"].discard()
+def load_settings(secrets_path):
+    settings = {}
+    if not os.path.exists(secrets_path):
+        return settings
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            import toml
+            with open(secrets_path, encoding="utf-8") as secrets_file:
+                return toml.load(secrets_file)
+    with open(secrets_path, "rb") as secrets_file:
+        settings = tomllib.load(secrets_file)
+    return settings
+def format_timing_summary(metrics, ticket_count, seconds):
+    rows = metrics.rows()
+    width = max([len(row["Operation"]) for row in rows] + [len("Operation")])
+    lines = [
+        f"Tickets exported: {ticket_count}",
+        f"Total time: {seconds:.2f}s ({ticket_count / seconds if seconds else 0:.1f} tickets/s)",
+        f"{'Kind':<12} {'Operation':<{width}} {'Calls':>7} {'Errors':>6} {'Avg ms':>8} {'p95 ms':>8} {'Max ms':>8}"]
+    lines += [
+        f"{row['Kind']:<12} {row['Operation']:<{width}} {row['Calls']:>7} {row['Errors']:>6} {row['Avg ms']:>8} {row['p95 ms']:>8} {row['Max ms']:>8}"
+        for row in rows]
+    return "\n".join(lines)
+def parse_args(argv=None):
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Build the DXCSupport ticket report without the Streamlit UI.")
+    parser.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=DEFAULT_REPORT_DAYS), help="First dateEntered day, YYYY-MM-DD (default: a week ago).")
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="Last dateEntered day, YYYY-MM-DD (default: today).")
+    parser.add_argument("--board", default=DEFAULT_BOARD_NAME, help="Service board name or ID.")
+    parser.add_argument("--output", help="Report path; .xlsx, .csv or .parquet (default: dxc_connectwise_tickets_<start>_<end>.xlsx).")
+    parser.add_argument("--secrets", default=DEFAULT_SECRETS_PATH, help="secrets.toml with the [connectwise] section.")
+    parser.add_argument("--workers", type=int, help="Concurrent page and note requests (default: page_max_workers and notes_max_workers from secrets.toml).")
+    parser.add_argument("--requests-per-second", type=float, help="ConnectWise rate limit (default: requests_per_second from secrets.toml).")
+    return parser.parse_args(argv)
+def main(argv=None):
+    options = parse_args(argv)
+    if options.start > options.end:
+        print("--start must not be after --end.", file=sys.stderr)
+        return 2
+    output_path = options.output or f"dxc_connectwise_tickets_{options.start.isoformat()}_{options.end.isoformat()}.xlsx"
+    settings = load_settings(options.secrets)
+    connectwise_settings = settings.setdefault("connectwise", {})
+    if options.workers:
+        connectwise_settings.update(page_max_workers=options.workers, notes_max_workers=options.workers)
+    if options.requests_per_second:
+        connectwise_settings["requests_per_second"] = options.requests_per_second
+    configure(settings)
+    metrics = RenderMetrics("ticket_report")
+    set_metrics_provider(lambda: metrics)
+    started = monotonic()
+    auth_result = get_connectwise_auth_headers()
+    headers, base_url = auth_result.value
+    board_result = resolve_board_id(headers, base_url, options.board) if auth_result.ok else auth_result
+    report_result = board_result
+    if board_result.ok:
+        report_result = run_ticket_report(
+            headers, base_url, board_result.value, options.start, options.end, output_path,
+            on_page=lambda count: print(f"Loaded {count} tickets...", file=sys.stderr, flush=True))
+    seconds = monotonic() - started
+    for error in report_result.errors:
+        print(f"ERROR {error}", file=sys.stderr)
+    if not board_result.ok or report_result.value is None:
+        return 1
+    print(f"Board {options.board}, {options.start.isoformat()} to {options.end.isoformat()}: wrote {os.path.abspath(output_path)}")
+    print(format_timing_summary(metrics, report_result.value, seconds))
+    return 0 if report_result.ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+class Result:
+    __slots__ = ("value", "errors")
+    def __init__(self, value=None, errors=None):
+        self.value = value
+        self.errors = list(errors or [])
+    @property
+    def ok(self):
+        return not self.errors
+    @classmethod
+    def failure(cls, *errors, value=None):
+        return cls(value, errors)
+    def __repr__(self):
+        return f"Result(value={self.value!r}, errors={self.errors!r})"
+
+class ConnectWiseError(Exception):
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = list(errors)
@@ -0,0 +1,117 @@
+import json
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+
+from dxc_core.instrumentation import instrumented
+from dxc_core.runtime import get_section, process_resource
+
+TWO_HOUR_SLA_SITES = ["AQN", "BOI", "COR", "PAL", "SDG"]
+SITE_SLA_TIER = "Site"
+PRIORITY_SLA_TIERS = {
+    "Priority 1 - Critical": SITE_SLA_TIER,
+    "Priority 2 - High": SITE_SLA_TIER,
+    "Priority 3 - Medium": "2 Day",
+    "Priority 4 - Low": "4 Day"}
+SITE_SLA_TIERS = {site_code: "2 Hour" for site_code in TWO_HOUR_SLA_SITES}
+DEFAULT_SITE_SLA_TIER = "4 Hour"
+DEFAULT_SLA_TIER = "N/A"
+WEEKDAYS = [0, 1, 2, 3, 4]
+ALL_DAYS = [0, 1, 2, 3, 4, 5, 6]
+MULTIPLIER_RULES = [
+    (ALL_DAYS, 0, 24, 2.0),
+    (WEEKDAYS, 8, 18, 1.0),
+    (WEEKDAYS, 18, 24, 1.5),
+    ([5], 8, 18, 1.5)]
+DEFAULT_MULTIPLIER = 1.0
+CHECK_TIME_FORMATS = ["%I:%M %p", "%H:%M"]
+
+class BillingRules:
+    def __init__(self, priority_sla_tiers, site_sla_tiers, default_site_sla_tier, multiplier_rules):
+        self.priority_sla_tiers = dict(priority_sla_tiers)
+        self.site_sla_tiers = dict(site_sla_tiers)
+        self.default_site_sla_tier = default_site_sla_tier
+        self.multiplier_grid = np.full((7, 24), DEFAULT_MULTIPLIER)
+        for days, start_hour, end_hour, multiplier in multiplier_rules:
+            self.multiplier_grid[np.ix_(list(days), range(start_hour, end_hour))] = multiplier
+    def priority_tier(self, priority_name):
+        return self.priority_sla_tiers.get(priority_name, DEFAULT_SLA_TIER) if isinstance(priority_name, str) else DEFAULT_SLA_TIER
+    def site_tier(self, site_code):
+        return self.site_sla_tiers.get(site_code, self.default_site_sla_tier) if isinstance(site_code, str) else self.default_site_sla_tier
+    def sla_tier(self, priority_name, site_code):
+        tier = self.priority_tier(priority_name)
+        if tier == SITE_SLA_TIER:
+            return self.site_tier(site_code)
+        return tier
+    def sla_tiers(self, priority_names, site_codes):
+        tiers = map_unique(priority_names, self.priority_tier)
+        site_tiers = map_unique(site_codes, self.site_tier)
+        return pd.Series(np.where(tiers == SITE_SLA_TIER, site_tiers, tiers))
+    def multiplier(self, check_in_date, check_in_time):
+        return float(self.multiplier_grid[check_in_date.weekday(), check_in_time.hour])
+    def multipliers(self, check_in_dates, check_in_times):
+        weekdays = map_unique(check_in_dates, billing_weekday).astype(int)
+        hours = map_unique(check_in_times, billing_hour).astype(int)
+        valid = (weekdays >= 0) & (hours >= 0)
+        result = np.full(len(weekdays), DEFAULT_MULTIPLIER)
+        result[valid] = self.multiplier_grid[weekdays[valid], hours[valid]]
+        return pd.Series(result)
+def map_unique(values, function):
+    if not isinstance(values, pd.Series):
+        values = pd.Series(list(values), dtype=object)
+    codes, uniques = pd.factorize(values)
+    mapped = [function(value) for value in uniques]
+    if (codes < 0).any():
+        mapped.append(function(None))
+    mapped_values = np.empty(len(mapped), dtype=object)
+    mapped_values[:] = mapped
+    return mapped_values[codes]
+def parse_check_time(time_str):
+    if not time_str:
+        return None
+    for fmt in CHECK_TIME_FORMATS:
+        try:
+            return datetime.strptime(time_str, fmt).time()
+        except ValueError:
+            continue
+    return None
+def billing_weekday(check_in_date):
+    if isinstance(check_in_date, str):
+        try:
+            return date.fromisoformat(check_in_date[:10]).weekday()
+        except ValueError:
+            return -1
+    if isinstance(check_in_date, date):
+        return check_in_date.weekday()
+    return -1
+def billing_hour(check_in_time):
+    if isinstance(check_in_time, time):
+        return check_in_time.hour
+    if isinstance(check_in_time, str):
+        parsed_time = parse_check_time(check_in_time)
+        if parsed_time:
+            return parsed_time.hour
+    return -1
+def site_code_from_name(site_name, default=None):
+    return site_name.split(' - ')[-1].strip() if isinstance(site_name, str) and ' - ' in site_name else default
+@process_resource
+def load_billing_rules(rule_overrides_json):
+    rule_overrides = json.loads(rule_overrides_json)
+    return BillingRules(
+        {**PRIORITY_SLA_TIERS, **rule_overrides.get("priority_sla_tiers", {})},
+        {**SITE_SLA_TIERS, **rule_overrides.get("site_sla_tiers", {})},
+        rule_overrides.get("default_site_sla_tier", DEFAULT_SITE_SLA_TIER),
+        rule_overrides.get("multiplier_rules", MULTIPLIER_RULES))
+def get_billing_rules():
+    return load_billing_rules(json.dumps(get_section("billing_rules"), sort_keys=True, default=str))
+def calculate_multiplier(check_in_date, check_in_time):
+    return get_billing_rules().multiplier(check_in_date, check_in_time)
+@instrumented("recompute_dispatch_billing")
+def recompute_dispatch_billing(dispatches_df):
+    billing_rules = get_billing_rules()
+    site_codes = map_unique(dispatches_df['Site'], site_code_from_name)
+    recomputed_df = dispatches_df.copy()
+    recomputed_df['SLA'] = billing_rules.sla_tiers(dispatches_df['Priority'], site_codes).to_numpy()
+    recomputed_df['Multiplier'] = billing_rules.multipliers(dispatches_df['CheckInDate'], dispatches_df['CheckInTime']).to_numpy()
+    return recomputed_df
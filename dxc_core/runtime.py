@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+SETTINGS = {}
+THREAD_INITIALIZER_FACTORIES = {}
+
+def configure(settings):
+    global SETTINGS
+    SETTINGS = {name: dict(section) for name, section in (settings or {}).items() if isinstance(section, dict)}
+def get_section(name):
+    return SETTINGS.get(name, {})
+def get_setting(key, default, section="connectwise"):
+    try:
+        return type(default)(get_section(section).get(key, default))
+    except (TypeError, ValueError):
+        return default
+def set_thread_initializer_factory(factory, name="app"):
+    if factory:
+        THREAD_INITIALIZER_FACTORIES[name] = factory
+    else:
+        THREAD_INITIALIZER_FACTORIES.pop(name, None)
+def thread_pool(max_workers):
+    initializers = [factory() for factory in list(THREAD_INITIALIZER_FACTORIES.values())]
+    def initializer():
+        for thread_initializer in initializers:
+            thread_initializer()
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), initializer=initializer if initializers else None)
+def process_resource(function):
+    lock = threading.Lock()
+    resources = {}
+    @wraps(function)
+    def wrapper(*args):
+        with lock:
+            if args not in resources:
+                resources[args] = function(*args)
+            return resources[args]
+    wrapper.clear = resources.clear
+    return wrapper
@@ -0,0 +1,82 @@
+import os
+from datetime import timedelta
+
+import pandas as pd
+
+from dxc_core.flatten import flatten_ticket_frame
+from dxc_core.instrumentation import instrumented
+from dxc_core.results import Result
+from dxc_core.runtime import get_setting
+
+TICKET_SNAPSHOT_DIR = "dxc_ticket_snapshots"
+SNAPSHOT_COLUMNS = [
+    'id', 'summary', 'board', 'status', 'type', 'subType', 'item', 'priority', 'site', 'siteName', 'dateEntered',
+    'HP Now Ticket #', 'SLA',
+    'CW-Technician Name (Custom Field)', 'CW-Total Hours (Custom Field)', 'CW-Check-In (Custom Field)', 'CW-Check-Out (Custom Field)']
+SLA_HISTORY_COLUMNS = ['id', 'month', 'SLA', 'site', 'priority']
+
+def get_ticket_snapshot_dir():
+    return get_setting("ticket_snapshot_dir", TICKET_SNAPSHOT_DIR)
+def month_starts(start_date, end_date):
+    month_start = start_date.replace(day=1)
+    months = []
+    while month_start <= end_date:
+        months.append(month_start)
+        month_start = (month_start + timedelta(days=32)).replace(day=1)
+    return months
+def snapshot_table(flattened_tickets, board_id, month):
+    import pyarrow as pa
+    arrays = []
+    for column in SNAPSHOT_COLUMNS:
+        values = flattened_tickets[column] if column in flattened_tickets.columns else [None] * len(flattened_tickets)
+        if column == 'id':
+            arrays.append(pa.array(values, type=pa.int64()))
+        else:
+            arrays.append(pa.array([None if value is None or (isinstance(value, float) and pd.isna(value)) else str(value) for value in values], type=pa.string()))
+    arrays.append(pa.array([board_id] * len(flattened_tickets), type=pa.int64()))
+    arrays.append(pa.array([month] * len(flattened_tickets), type=pa.string()))
+    return pa.Table.from_arrays(arrays, names=SNAPSHOT_COLUMNS + ['board_id', 'month'])
+@instrumented("write_ticket_snapshots")
+def write_ticket_snapshots(store, board_id, start_date, end_date, headers, base_url, snapshot_dir=None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    snapshot_dir = snapshot_dir or get_ticket_snapshot_dir()
+    partitioning = ds.partitioning(pa.schema([("board_id", pa.int64()), ("month", pa.string())]), flavor="hive")
+    written_rows = 0
+    errors = []
+    for month_start in month_starts(start_date, end_date):
+        month = month_start.strftime("%Y-%m")
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        month_tables = []
+        for tickets, notes_by_ticket in store.iter_ticket_pages(board_id, month_start, month_end):
+            frame_result = flatten_ticket_frame(tickets, headers, base_url, notes_by_ticket)
+            errors += frame_result.errors
+            month_tables.append(snapshot_table(frame_result.value, board_id, month))
+        if not month_tables:
+            continue
+        ds.write_dataset(
+            pa.concat_tables(month_tables),
+            snapshot_dir,
+            format="parquet",
+            partitioning=partitioning,
+            basename_template=f"tickets-{month}-{{i}}.parquet",
+            existing_data_behavior="delete_matching")
+        written_rows += sum(table.num_rows for table in month_tables)
+    return Result(written_rows, errors)
+def load_ticket_snapshots(board_id, start_month, end_month, columns=None, snapshot_dir=None):
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+    snapshot_dir = snapshot_dir or get_ticket_snapshot_dir()
+    if not os.path.isdir(snapshot_dir):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(snapshot_dir, format="parquet", partitioning="hive", filesystem=fs.LocalFileSystem(use_mmap=True))
+    partition_filter = (ds.field("board_id") == board_id) & (ds.field("month") >= start_month) & (ds.field("month") <= end_month)
+    return dataset.to_table(columns=columns, filter=partition_filter).to_pandas()
+def build_sla_month_over_month(snapshot_df):
+    if snapshot_df.empty:
+        return pd.DataFrame()
+    sla_counts = snapshot_df.pivot_table(index='month', columns='SLA', values='id', aggfunc='count', fill_value=0)
+    sla_counts.columns.name = None
+    sla_counts['Total'] = sla_counts.sum(axis=1)
+    sla_counts['Total MoM %'] = (sla_counts['Total'].pct_change() * 100).round(1)
+    return sla_counts.reset_index().rename(columns={'month': 'Month'})
@@ -0,0 +1,180 @@
+import json
+import sqlite3
+import threading
+from datetime import date, timedelta
+
+from dxc_core.connectwise import REPORT_TICKET_FIELDS, get_connectwise_notes_for_tickets, iter_connectwise_ticket_pages
+from dxc_core.results import ConnectWiseError, Result
+from dxc_core.runtime import get_setting, process_resource
+
+TICKET_STORE_PATH = "dxc_ticket_store.sqlite3"
+SQLITE_MAX_PARAMETERS = 900
+
+class TicketStore:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS tickets (
+                    id INTEGER PRIMARY KEY,
+                    board_id INTEGER,
+                    date_entered TEXT,
+                    last_updated TEXT,
+                    data TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS tickets_board_date_entered ON tickets (board_id, date_entered);
+                CREATE TABLE IF NOT EXISTS ticket_notes (
+                    ticket_id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    board_id INTEGER PRIMARY KEY,
+                    synced_from TEXT,
+                    watermark TEXT);
+                CREATE TABLE IF NOT EXISTS sync_ranges (
+                    board_id INTEGER,
+                    start_date TEXT,
+                    end_date TEXT);
+                INSERT INTO sync_ranges (board_id, start_date, end_date)
+                    SELECT board_id, substr(synced_from, 1, 10), substr(watermark, 1, 10) FROM sync_state
+                    WHERE synced_from IS NOT NULL AND watermark IS NOT NULL AND board_id NOT IN (SELECT board_id FROM sync_ranges);""")
+    def get_sync_state(self, board_id):
+        with self.lock:
+            row = self.connection.execute("SELECT watermark FROM sync_state WHERE board_id = ?", (board_id,)).fetchone()
+            range_rows = self.connection.execute("SELECT start_date, end_date FROM sync_ranges WHERE board_id = ? ORDER BY start_date", (board_id,)).fetchall()
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in range_rows], row[0] if row else None
+    def set_sync_state(self, board_id, synced_ranges, watermark):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO sync_state (board_id, synced_from, watermark) VALUES (?, ?, ?) "
+                "ON CONFLICT(board_id) DO UPDATE SET synced_from = excluded.synced_from, watermark = excluded.watermark",
+                (board_id, synced_ranges[0][0].strftime("%Y-%m-%dT00:00:00Z") if synced_ranges else None, watermark))
+            self.connection.execute("DELETE FROM sync_ranges WHERE board_id = ?", (board_id,))
+            self.connection.executemany(
+                "INSERT INTO sync_ranges (board_id, start_date, end_date) VALUES (?, ?, ?)",
+                [(board_id, start.isoformat(), end.isoformat()) for start, end in synced_ranges])
+    def reset_board(self, board_id):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM ticket_notes WHERE ticket_id IN (SELECT id FROM tickets WHERE board_id = ?)", (board_id,))
+            self.connection.execute("DELETE FROM tickets WHERE board_id = ?", (board_id,))
+            self.connection.execute("DELETE FROM sync_state WHERE board_id = ?", (board_id,))
+            self.connection.execute("DELETE FROM sync_ranges WHERE board_id = ?", (board_id,))
+    def unchanged_ticket_ids(self, tickets):
+        last_updated_by_id = {ticket['id']: ticket.get('_info', {}).get('lastUpdated') for ticket in tickets}
+        ticket_ids = list(last_updated_by_id)
+        rows = []
+        with self.lock:
+            for start in range(0, len(ticket_ids), SQLITE_MAX_PARAMETERS):
+                batch_ids = ticket_ids[start:start + SQLITE_MAX_PARAMETERS]
+                rows += self.connection.execute(
+                    f"SELECT t.id, t.last_updated FROM tickets t JOIN ticket_notes n ON n.ticket_id = t.id WHERE t.id IN ({','.join('?' * len(batch_ids))})",
+                    batch_ids).fetchall()
+        return {ticket_id for ticket_id, last_updated in rows if last_updated is not None and last_updated == last_updated_by_id[ticket_id]}
+    def ticket_ids_missing_notes(self, board_id, start_date, end_date):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT t.id FROM tickets t LEFT JOIN ticket_notes n ON n.ticket_id = t.id "
+                "WHERE t.board_id = ? AND t.date_entered >= ? AND t.date_entered <= ? AND n.ticket_id IS NULL ORDER BY t.id",
+                (board_id, start_date.strftime("%Y-%m-%dT00:00:00Z"), end_date.strftime("%Y-%m-%dT23:59:59Z"))).fetchall()
+        return [row[0] for row in rows]
+    def save_tickets(self, tickets, notes_by_ticket):
+        ticket_rows = [
+            (ticket['id'], ticket.get('board', {}).get('id'), ticket.get('dateEntered'), ticket.get('_info', {}).get('lastUpdated'), json.dumps(ticket))
+            for ticket in tickets]
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO tickets (id, board_id, date_entered, last_updated, data) VALUES (?, ?, ?, ?, ?)", ticket_rows)
+        self.save_notes(notes_by_ticket)
+    def save_notes(self, notes_by_ticket):
+        note_rows = [(ticket_id, json.dumps(notes)) for ticket_id, notes in notes_by_ticket.items() if notes is not None]
+        failed_ids = [(ticket_id,) for ticket_id, notes in notes_by_ticket.items() if notes is None]
+        with self.lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO ticket_notes (ticket_id, data) VALUES (?, ?)", note_rows)
+            self.connection.executemany("DELETE FROM ticket_notes WHERE ticket_id = ?", failed_ids)
+    def iter_ticket_pages(self, board_id, start_date, end_date, page_size=1000):
+        start_date_str = start_date.strftime("%Y-%m-%dT00:00:00Z")
+        end_date_str = end_date.strftime("%Y-%m-%dT23:59:59Z")
+        last_id = -1
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT t.id, t.data, n.data FROM tickets t LEFT JOIN ticket_notes n ON n.ticket_id = t.id "
+                    "WHERE t.board_id = ? AND t.date_entered >= ? AND t.date_entered <= ? AND t.id > ? ORDER BY t.id LIMIT ?",
+                    (board_id, start_date_str, end_date_str, last_id, page_size)).fetchall()
+            if not rows:
+                return
+            tickets = []
+            notes_by_ticket = {}
+            for ticket_id, ticket_json, notes_json in rows:
+                tickets.append(json.loads(ticket_json))
+                if notes_json is not None:
+                    notes_by_ticket[ticket_id] = json.loads(notes_json)
+            yield tickets, notes_by_ticket
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+@process_resource
+def open_ticket_store(path):
+    return TicketStore(path)
+def get_ticket_store():
+    return open_ticket_store(get_setting("ticket_store_path", TICKET_STORE_PATH))
+def merge_date_ranges(date_ranges):
+    merged = []
+    for start, end in sorted(date_ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+def uncovered_date_ranges(date_ranges, start_date, end_date):
+    gaps = []
+    cursor = start_date
+    for range_start, range_end in merge_date_ranges(date_ranges):
+        if range_end < cursor:
+            continue
+        if range_start > end_date:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start - timedelta(days=1)))
+        cursor = range_end + timedelta(days=1)
+    if cursor <= end_date:
+        gaps.append((cursor, end_date))
+    return gaps
+def in_date_ranges(timestamp, date_ranges):
+    return bool(timestamp) and any(start.isoformat() <= timestamp[:10] <= end.isoformat() for start, end in date_ranges)
+def sync_connectwise_tickets(headers, base_url, board_id, start_date, end_date, store, on_page=None):
+    synced_ranges, watermark = store.get_sync_state(board_id)
+    gaps = uncovered_date_ranges(synced_ranges, start_date, end_date)
+    covered_ranges = merge_date_ranges(synced_ranges + gaps)
+    page_sources = []
+    if synced_ranges and watermark:
+        page_sources.append(iter_connectwise_ticket_pages(headers, base_url, board_id=board_id, start_date=synced_ranges[0][0], updated_since=watermark, fields=REPORT_TICKET_FIELDS))
+    for gap_start, gap_end in gaps:
+        page_sources.append(iter_connectwise_ticket_pages(headers, base_url, board_id=board_id, start_date=gap_start, end_date=gap_end, parallel=True, fields=REPORT_TICKET_FIELDS))
+    changed_count = 0
+    new_watermark = watermark
+    errors = []
+    fetched_note_ids = set()
+    try:
+        for ticket_pages in page_sources:
+            for tickets in ticket_pages:
+                last_updated_values = [ticket.get('_info', {}).get('lastUpdated') for ticket in tickets]
+                new_watermark = max([value for value in last_updated_values if value] + ([new_watermark] if new_watermark else []), default=None)
+                unchanged_ids = store.unchanged_ticket_ids(tickets)
+                tickets = [ticket for ticket in tickets if ticket['id'] not in unchanged_ids and in_date_ranges(ticket.get('dateEntered'), covered_ranges)]
+                if tickets:
+                    notes_result = get_connectwise_notes_for_tickets(headers, base_url, [ticket['id'] for ticket in tickets])
+                    errors += notes_result.errors
+                    store.save_tickets(tickets, notes_result.value)
+                    fetched_note_ids.update(notes_result.value)
+                    changed_count += len(tickets)
+                if on_page:
+                    on_page(changed_count)
+    except ConnectWiseError as e:
+        return Result.failure(*(errors + e.errors))
+    missing_note_ids = [ticket_id for ticket_id in store.ticket_ids_missing_notes(board_id, start_date, end_date) if ticket_id not in fetched_note_ids]
+    if missing_note_ids:
+        notes_result = get_connectwise_notes_for_tickets(headers, base_url, missing_note_ids)
+        errors += notes_result.errors
+        store.save_notes(notes_result.value)
+    store.set_sync_state(board_id, covered_ranges if new_watermark else synced_ranges, new_watermark)
+    return Result(changed_count, errors)
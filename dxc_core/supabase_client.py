@@ -0,0 +1,40 @@
+from dxc_core.instrumentation import mark_supabase_request, record_supabase_response
+from dxc_core.results import Result
+from dxc_core.runtime import get_section, process_resource
+
+REJECTED_ROW_SQLSTATE_CLASSES = ("22", "23", "42")
+NOT_ROW_SPECIFIC_ERROR_CODES = ("401", "403", "408", "429", "42501")
+
+@process_resource
+def get_supabase_client(url, key):
+    from supabase import create_client
+    client = create_client(url, key)
+    client.postgrest.session.event_hooks["request"].append(mark_supabase_request)
+    client.postgrest.session.event_hooks["response"].append(record_supabase_response)
+    return client
+def get_supabase_credentials():
+    supabase_settings = get_section("supabase")
+    try:
+        return Result((supabase_settings["SUPABASE_URL"], supabase_settings["SUPABASE_KEY"]))
+    except KeyError as e:
+        return Result.failure(f"Missing Supabase credential in `secrets.toml`: {e}")
+def create_supabase_client():
+    credentials = get_supabase_credentials()
+    if not credentials.ok:
+        return credentials
+    return Result(get_supabase_client(*credentials.value))
+def is_rejected_row_error(error):
+    if isinstance(error, TypeError):
+        return True
+    if type(error).__name__ != "APIError":
+        return False
+    code = str(error.code or "")
+    if code in NOT_ROW_SPECIFIC_ERROR_CODES:
+        return False
+    if code.isdigit() and len(code) == 3:
+        return code.startswith("4")
+    if code.startswith("PGRST"):
+        return code[5:6] in ("1", "2")
+    return code[:2] in REJECTED_ROW_SQLSTATE_CLASSES
+def describe_supabase_error(error):
+    return getattr(error, "message", None) or str(error)
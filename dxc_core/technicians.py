@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+import pandas as pd
+
+from dxc_core.results import Result
+from dxc_core.runtime import process_resource
+from dxc_core.supabase_client import create_supabase_client
+
+SITE_ROSTER_TTL_SECONDS = 300
+TECHNICIAN_COLUMNS = ['FIRST_NAME', 'LAST_NAME', 'PHONE_NUMBER', 'FIELD_NATION_ID', 'SURYL_EMAIL']
+
+class SiteRosterCache:
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.refreshing = set()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+    def get(self, site_code, loader):
+        with self.lock:
+            entry = self.entries.get(site_code)
+            if entry and monotonic() - entry[0] > self.ttl_seconds and site_code not in self.refreshing:
+                self.refreshing.add(site_code)
+                self.executor.submit(self.refresh_in_background, site_code, loader)
+        if entry:
+            return entry[1]
+        return self.refresh(site_code, loader)
+    def refresh(self, site_code, loader):
+        roster = loader(site_code)
+        if roster is not None:
+            with self.lock:
+                self.entries[site_code] = (monotonic(), roster)
+        return roster
+    def refresh_in_background(self, site_code, loader):
+        try:
+            self.refresh(site_code, loader)
+        except Exception:
+            pass
+        finally:
+            with self.lock:
+                self.refreshing.discard(site_code)
+    def invalidate(self, site_code=None):
+        with self.lock:
+            if site_code is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(site_code, None)
+
+def query_technicians_by_site(supabase, site_code):
+    response_names_and_sites = supabase.table('names_and_sites').select('Name').eq('Site', site_code).eq('Badge', 'YES').execute()
+    if not response_names_and_sites.data:
+        return pd.DataFrame()
+    badged_tech_names = [item['Name'] for item in response_names_and_sites.data]
+    if not badged_tech_names:
+        return pd.DataFrame()
+    name_pairs = [(parts[0], parts[-1]) for parts in (full_name.split() for full_name in badged_tech_names) if parts]
+    if not name_pairs:
+        return pd.DataFrame()
+    first_names = sorted({first_name for first_name, _ in name_pairs})
+    last_names = sorted({last_name for _, last_name in name_pairs})
+    response_tech_info = supabase.table('TECH INFORMATION').select(', '.join(TECHNICIAN_COLUMNS)).eq('SITE', site_code).in_('FIRST_NAME', first_names).in_('LAST_NAME', last_names).execute()
+    tech_info_by_name = {}
+    for tech_info in response_tech_info.data or []:
+        tech_info_by_name.setdefault((tech_info['FIRST_NAME'], tech_info['LAST_NAME']), tech_info)
+    tech_data = [tech_info_by_name[name_pair] for name_pair in name_pairs if name_pair in tech_info_by_name]
+    if tech_data:
+        return pd.DataFrame(tech_data)[TECHNICIAN_COLUMNS]
+    return pd.DataFrame()
+def get_technicians_by_site(supabase, site_code):
+    try:
+        return Result(query_technicians_by_site(supabase, site_code))
+    except Exception as e:
+        return Result.failure(f"Error querying Supabase: {e}")
+@process_resource
+def get_site_roster_cache():
+    return SiteRosterCache(SITE_ROSTER_TTL_SECONDS)
+def get_site_roster(supabase, site_code):
+    try:
+        return Result(get_site_roster_cache().get(site_code, lambda code: query_technicians_by_site(supabase, code)))
+    except Exception as e:
+        return Result.failure(f"Error querying Supabase: {e}")
+def load_site_roster(site_code):
+    supabase_result = create_supabase_client()
+    if not supabase_result.ok:
+        return supabase_result
+    return get_site_roster(supabase_result.value, site_code)
+def invalidate_site_roster(site_code=None):
+    get_site_roster_cache().invalidate(site_code)